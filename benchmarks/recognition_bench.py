@@ -0,0 +1,212 @@
+"""
+图像识别性能基准测试，可完全离线运行。
+
+用法:
+    python benchmarks/recognition_bench.py [--iterations 50] [--output bench_output.json]
+                                           [--baseline 上次的结果.json --tolerance 0.2]
+
+在临时目录中生成一个随机权重的 ResNet-18 检查点与 class_names.txt，
+以及多种尺寸的合成图片，分别测量以下各阶段的 p50/p95/p99 延迟与吞吐量:
+    - _preprocess_image
+    - _predict
+    - classify_image
+    - /api/recognize/image 接口（Flask 测试客户端 + SQLite）
+结果以 JSON 格式写出；指定 --baseline 时，任何一项 p95 比基准慢超过 tolerance 即以非零状态码退出。
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+from torchvision import models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from my_app import create_app, db, bcrypt  # noqa: E402
+from my_app.models import User  # noqa: E402
+from my_app.recognition import image_model  # noqa: E402
+
+CLASS_NAMES = ['battery', 'biological', 'cardboard', 'clothes', 'glass',
+               'metal', 'paper', 'plastic', 'shoes', 'trash']
+
+# 合成图片尺寸: 缩略图、普通照片、1200 万像素手机照片
+IMAGE_SIZES = [(320, 240), (1280, 960), (4032, 3024)]
+
+
+def build_fixtures(workdir):
+    """在 workdir 中生成随机权重的检查点与类别文件，并让 image_model 指向它们"""
+    class_names_file = os.path.join(workdir, 'class_names.txt')
+    with open(class_names_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(CLASS_NAMES))
+
+    torch.manual_seed(0)
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, len(CLASS_NAMES))
+    model_path = os.path.join(workdir, 'garbage_classifier_resnet18.pth')
+    torch.save({'model_state_dict': model.state_dict()}, model_path)
+
+    image_model.MODEL_PATH = model_path
+    image_model.CLASS_NAMES_FILE = class_names_file
+    image_model.MODEL = None
+
+
+def synthetic_jpeg(width, height, seed=0):
+    """生成一张带有平滑色块的合成 JPEG 图片，近似真实照片的压缩特性"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+    img = Image.fromarray(blocks).resize((width, height), Image.BICUBIC)
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+
+def measure(fn, iterations, warmup):
+    """执行 fn 若干次，返回延迟分位数（毫秒）与吞吐量（次/秒）"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))]
+
+    return {
+        'iterations': iterations,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'mean_ms': sum(samples) / len(samples),
+        'throughput_per_s': iterations / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def make_app(workdir):
+    """基于 SQLite 的测试应用，关闭结果缓存与图片落盘，确保每次请求都真实执行推理"""
+
+    class BenchConfig(Config):
+        TESTING = True
+        SECRET_KEY = 'recognition-benchmark-secret-key-0123456789'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'bench.sqlite')
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        UPLOAD_PERSIST_MODE = 'off'
+        RECOGNITION_CACHE_SIZE = 0
+        INFERENCE_BATCHING = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        password = bcrypt.generate_password_hash('bench').decode('utf-8')
+        db.session.add(User(username='bench', password=password))
+        db.session.commit()
+    return app
+
+
+def run(iterations, warmup):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        build_fixtures(workdir)
+        app = make_app(workdir)
+        image_model.warm_up()
+
+        client = app.test_client()
+        token = client.post('/api/auth/login', json={'username': 'bench', 'password': 'bench'}).get_json()['token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        input_tensor = image_model._preprocess_image(io.BytesIO(synthetic_jpeg(*IMAGE_SIZES[0])))
+        results['_predict'] = measure(
+            lambda: image_model._predict(image_model.MODEL, input_tensor, image_model.CLASS_NAMES),
+            iterations, warmup)
+
+        for width, height in IMAGE_SIZES:
+            size = f'{width}x{height}'
+            data = synthetic_jpeg(width, height)
+
+            results[f'_preprocess_image[{size}]'] = measure(
+                lambda: image_model._preprocess_image(io.BytesIO(data)), iterations, warmup)
+
+            results[f'classify_image[{size}]'] = measure(
+                lambda: image_model.classify_image(io.BytesIO(data)), iterations, warmup)
+
+            def post():
+                response = client.post('/api/recognize/image', headers=headers,
+                                       data={'file': (io.BytesIO(data), 'bench.jpg')})
+                assert response.status_code == 200, response.get_json()
+
+            results[f'endpoint[{size}]'] = measure(post, iterations, warmup)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """返回 p95 相对基准变慢超过 tolerance 的测试项"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append((name, previous['p95_ms'], current['p95_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='图像识别性能基准测试')
+    parser.add_argument('--iterations', type=int, default=50, help='每项测试的计时次数')
+    parser.add_argument('--warmup', type=int, default=5, help='每项测试计时前的预热次数')
+    parser.add_argument('--threads', type=int, default=0, help='torch 算子内线程数，0 表示使用默认值')
+    parser.add_argument('--output', default='bench_output.json', help='结果输出文件 (JSON)')
+    parser.add_argument('--baseline', help='用于对比的历史结果文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的 p95 退化比例')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    results = run(args.iterations, args.warmup)
+
+    print(f"{'benchmark':<36}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'ops/s':>10}")
+    for name, r in results.items():
+        print(f"{name:<36}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['throughput_per_s']:>10.1f}")
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'torch_threads': torch.get_num_threads(),
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ 结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"❌ 性能退化: {name} p95 {before:.2f}ms -> {after:.2f}ms")
+        if regressions:
+            sys.exit(1)
+        print("✅ 与基准相比未发现性能退化")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+对比各推理后端在本地图片目录上的速度与准确率。
+
+用法:
+    python compare_backends.py <图片目录> [--backends eager torchscript ...] [--batch-size 8] [--output result.json]
+
+以 eager fp32 模型的 top-1 结果为基准，输出每个后端的
+单张延迟 (p50/p95)、批量吞吐量以及 top-1 一致率，
+据此选择在不损失准确率的前提下最快的后端（配置项 INFERENCE_BACKEND）。
+"""
+import argparse
+import json
+import statistics
+import time
+
+import torch
+
+from my_app.recognition.backends import BACKENDS, INPUT_SHAPE, build_backend
+from my_app.recognition.image_model import (
+    load_fp32_model, load_calibration_batches, list_image_files, _preprocess_image
+)
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def _top1(model, tensors, batch_size):
+    preds = []
+    with torch.inference_mode():
+        for i in range(0, len(tensors), batch_size):
+            preds.extend(model(torch.cat(tensors[i:i + batch_size])).argmax(dim=1).tolist())
+    return preds
+
+
+def benchmark_backend(model, tensors, batch_size, warmup):
+    """测量单张延迟与批量吞吐量"""
+    with torch.inference_mode():
+        for t in tensors[:warmup]:
+            model(t)
+
+        latencies = []
+        for t in tensors:
+            start = time.perf_counter()
+            model(t)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for i in range(0, len(tensors), batch_size):
+            model(torch.cat(tensors[i:i + batch_size]))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'latency_ms_p50': _percentile(latencies, 50),
+        'latency_ms_p95': _percentile(latencies, 95),
+        'latency_ms_mean': statistics.mean(latencies),
+        'throughput_ips': len(tensors) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比图像识别推理后端的速度与准确率')
+    parser.add_argument('image_dir', help='用于测试的本地图片目录（递归查找）')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--batch-size', type=int, default=8, help='吞吐量测试的批大小')
+    parser.add_argument('--limit', type=int, default=0, help='最多使用的图片数，0 表示全部')
+    parser.add_argument('--warmup', type=int, default=3, help='计时前的预热次数')
+    parser.add_argument('--calibration-dir', help='static_int8 的校准图片目录，默认与 image_dir 相同')
+    parser.add_argument('--threads', type=int, default=0, help='torch 算子内线程数，0 表示使用默认值')
+    parser.add_argument('--output', help='将结果以 JSON 格式写入该文件')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = list_image_files(args.image_dir)
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print(f"❌ 目录中没有找到图片: {args.image_dir}")
+        return
+    print(f"🚀 共 {len(paths)} 张图片，torch 线程数 {torch.get_num_threads()}")
+
+    tensors = [_preprocess_image(p) for p in paths]
+    fp32_model, _ = load_fp32_model()
+    baseline = _top1(fp32_model, tensors, args.batch_size)
+    calibration = load_calibration_batches(args.calibration_dir or args.image_dir)
+    if not calibration:
+        # 仅用于对比速度：随机输入校准的 static_int8 准确率没有参考价值，服务中不允许这样配置
+        print("⚠️ 校准目录中没有图片，static_int8 改用随机输入校准，其 top-1 一致率仅供参考")
+        calibration = [torch.randn(8, *INPUT_SHAPE[1:])]
+
+    results = {}
+    for backend in args.backends:
+        try:
+            model = build_backend(fp32_model, backend, calibration)
+        except Exception as e:
+            print(f"  ❌ {backend}: 构建失败 ({e})")
+            continue
+        result = benchmark_backend(model, tensors, args.batch_size, args.warmup)
+        preds = _top1(model, tensors, args.batch_size)
+        result['top1_agreement'] = sum(a == b for a, b in zip(preds, baseline)) / len(baseline)
+        results[backend] = result
+
+    print(f"\n{'backend':<15}{'p50(ms)':>10}{'p95(ms)':>10}{'img/s':>10}{'top1一致率':>12}")
+    for backend, r in results.items():
+        print(f"{backend:<15}{r['latency_ms_p50']:>10.2f}{r['latency_ms_p95']:>10.2f}"
+              f"{r['throughput_ips']:>10.1f}{r['top1_agreement']:>12.2%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'images': len(paths), 'batch_size': args.batch_size, 'results': results}, f, indent=2)
+        print(f"\n✅ 结果已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,3 +13,82 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     UPLOAD_FOLDER = os.path.join(basedir, 'my_app/recognition/uploads')
+    # 上传图片的保存方式: async-后台线程异步保存, sync-请求内同步保存, off-不保存
+    UPLOAD_PERSIST_MODE = os.environ.get('UPLOAD_PERSIST_MODE', 'async').lower()
+    # async 模式下等待后台写入的图片数上限，超过后退回请求内同步写入
+    UPLOAD_WRITER_MAX_PENDING = int(os.environ.get('UPLOAD_WRITER_MAX_PENDING', 256))
+
+    # --- 图像识别推理配置 ---
+    # 开启后，并发的图片识别请求会被合并为批量前向计算
+    INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', 'true').lower() == 'true'
+    # 单个批次的最大图片数
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 8))
+    # 批次中第一个请求的最长等待时间（毫秒）
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 10))
+    # 推理工作池: 同时执行的识别请求数、允许排队的请求数，
+    # 以及队列满时返回 503 所带的 Retry-After（秒）
+    # 开启微批处理时，执行数小于 INFERENCE_MAX_BATCH_SIZE 会使批次永远凑不满，启动时自动提高到批大小
+    INFERENCE_POOL_WORKERS = int(os.environ.get('INFERENCE_POOL_WORKERS', 8))
+    INFERENCE_POOL_QUEUE_SIZE = int(os.environ.get('INFERENCE_POOL_QUEUE_SIZE', 16))
+    INFERENCE_POOL_RETRY_AFTER = int(os.environ.get('INFERENCE_POOL_RETRY_AFTER', 1))
+    # 推理后端: eager / torchscript / dynamic_int8 / static_int8 / channels_last
+    # 可先用 compare_backends.py 在本地图片上对比速度与准确率后再选择
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager').lower()
+    # static_int8 后端的校准图片目录（建议放入几十张真实的垃圾图片）
+    INFERENCE_CALIBRATION_DIR = os.environ.get('INFERENCE_CALIBRATION_DIR')
+    # 多图识别接口单次最多接收的图片数，以及并行预处理的线程数
+    RECOGNITION_MAX_FILES_PER_REQUEST = int(os.environ.get('RECOGNITION_MAX_FILES_PER_REQUEST', 32))
+    RECOGNITION_PREPROCESS_WORKERS = int(os.environ.get('RECOGNITION_PREPROCESS_WORKERS', 4))
+    # 允许识别的最大图片像素数（宽 x 高），超过时在解码前直接拒绝
+    RECOGNITION_MAX_IMAGE_PIXELS = int(os.environ.get('RECOGNITION_MAX_IMAGE_PIXELS', 50_000_000))
+    # 每个 worker 进程的 torch 算子内线程数，0 表示按 CPU 核数 / worker 数自动计算
+    TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', 0))
+
+    # --- 图像识别结果缓存 ---
+    # 最多缓存的识别结果条数，设为 0 关闭缓存
+    RECOGNITION_CACHE_SIZE = int(os.environ.get('RECOGNITION_CACHE_SIZE', 4096))
+    # 单条结果的存活时间（秒）
+    RECOGNITION_CACHE_TTL = float(os.environ.get('RECOGNITION_CACHE_TTL', 3600))
+    # 缓存键: sha256-按内容摘要精确匹配, phash-按感知哈希匹配近似图片（需安装 imagehash）
+    RECOGNITION_CACHE_KEY = os.environ.get('RECOGNITION_CACHE_KEY', 'sha256').lower()
+
+    # --- 文字识别 ---
+    # 使用进程内子串索引代替 LIKE '%q%' 全表扫描
+    GARBAGE_INDEX_ENABLED = os.environ.get('GARBAGE_INDEX_ENABLED', 'true').lower() == 'true'
+    # 检查数据库中物品数据是否被其他进程修改的间隔（秒）
+    GARBAGE_INDEX_CHECK_INTERVAL = float(os.environ.get('GARBAGE_INDEX_CHECK_INTERVAL', 30))
+    # 子串匹配落空时的容错查找：允许的最大编辑距离（0-2，0 表示关闭；每增加 1 索引内存约增加数倍）
+    GARBAGE_FUZZY_MAX_DISTANCE = int(os.environ.get('GARBAGE_FUZZY_MAX_DISTANCE', 1))
+    # 是否按拼音全拼/首字母匹配（需要安装 pypinyin）
+    GARBAGE_FUZZY_PINYIN = os.environ.get('GARBAGE_FUZZY_PINYIN', 'true').lower() == 'true'
+
+    # --- 文章检索 ---
+    # 检查数据库中文章是否被其他进程修改的间隔（秒）
+    ARTICLE_INDEX_CHECK_INTERVAL = float(os.environ.get('ARTICLE_INDEX_CHECK_INTERVAL', 30))
+    # 公开文章接口的响应缓存条目上限（0 表示关闭）
+    ARTICLE_CACHE_SIZE = int(os.environ.get('ARTICLE_CACHE_SIZE', 1024))
+    # 检查其他进程是否修改了文章的间隔（秒），即多进程部署时缓存内容的最长滞后时间
+    ARTICLE_CACHE_CHECK_INTERVAL = float(os.environ.get('ARTICLE_CACHE_CHECK_INTERVAL', 5))
+
+    # --- 用户管理 ---
+    # 检查数据库中用户是否被其他进程新增或删除的间隔（秒），用于用户名子串索引
+    USER_INDEX_CHECK_INTERVAL = float(os.environ.get('USER_INDEX_CHECK_INTERVAL', 30))
+
+    # --- 识别历史写入 ---
+    # sync-每次识别在请求内提交历史与积分, buffered-放入进程内缓冲，由后台线程定期批量写入
+    HISTORY_WRITE_MODE = os.environ.get('HISTORY_WRITE_MODE', 'sync').lower()
+    # buffered 模式下的写入间隔（秒）与触发提前写入的缓冲条数
+    HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0))
+    HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 500))
+    # 缓冲积压的上限（例如数据库持续不可用时），超过后退回请求内同步写入
+    HISTORY_BUFFER_MAX_PENDING = int(os.environ.get('HISTORY_BUFFER_MAX_PENDING', 50000))
+    # 整批写入连续失败该次数后，拆分批次找出并丢弃无法写入的事件
+    HISTORY_FLUSH_MAX_ATTEMPTS = int(os.environ.get('HISTORY_FLUSH_MAX_ATTEMPTS', 3))
+    # archive-history 命令默认归档早于该天数的识别历史
+    HISTORY_ARCHIVE_AFTER_DAYS = int(os.environ.get('HISTORY_ARCHIVE_AFTER_DAYS', 365))
+
+    # --- 识别趋势统计 ---
+    # 小时统计的保留天数，更早的趋势只能按日、按月查询
+    STATS_HOURLY_RETENTION_DAYS = int(os.environ.get('STATS_HOURLY_RETENTION_DAYS', 30))
+    # 每日活跃用户明细的保留天数（已汇总为日/月活跃用户数的部分才会清理）
+    STATS_ACTIVITY_RETENTION_DAYS = int(os.environ.get('STATS_ACTIVITY_RETENTION_DAYS', 400))
@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+# 使用方法: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+# 每个 worker 内的线程数；并发请求越多，微批处理引擎越容易凑满批次
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# 在主进程中加载应用（含模型权重）后再 fork，worker 共享同一份权重
+wsgi_app = 'wsgi:app'
+preload_app = True
+
+
+def post_fork(server, worker):
+    """worker 启动后按核数均分 torch 线程，并完成推理预热"""
+    from wsgi import app
+    from my_app.recognition import image_model
+
+    num_threads = app.config.get('TORCH_NUM_THREADS') or max(1, multiprocessing.cpu_count() // server.cfg.workers)
+    image_model.init_worker(num_threads)
+
+
+def worker_exit(server, worker):
+    """worker 退出前写完缓冲中的识别历史与积分"""
+    from my_app.history.buffer import history_buffer
+
+    history_buffer.close()
@@ -0,0 +1,7 @@
+-- 管理员用户列表的筛选与分页索引 (MySQL)
+-- 对应 my_app/models.py 中 User.__table_args__；新建的数据库由 db.create_all() 自动创建，已有数据库需手动执行本文件。
+-- 按用户名前缀搜索直接使用 username 上已有的唯一索引。
+
+CREATE INDEX ix_user_role_status ON `user` (role, status);
+CREATE INDEX ix_user_status ON `user` (status);
+CREATE INDEX ix_user_points ON `user` (points);
@@ -0,0 +1,17 @@
+-- 识别历史的分类统计预聚合表 (MySQL)
+-- 对应 my_app/models.py 中的 CategoryDailyStat；执行后由已有的识别历史回填统计。
+-- 也可以改为执行 `flask --app run rebuild-category-stats` 回填。
+
+CREATE TABLE IF NOT EXISTS category_daily_stat (
+    day DATE NOT NULL COMMENT '日期',
+    query_type VARCHAR(20) NOT NULL COMMENT '查询方式 (''text'' 或 ''image'')',
+    result_category VARCHAR(50) NOT NULL COMMENT '识别结果分类',
+    count INT NOT NULL DEFAULT 0 COMMENT '识别次数',
+    PRIMARY KEY (day, query_type, result_category)
+);
+
+INSERT INTO category_daily_stat (day, query_type, result_category, count)
+SELECT DATE(created_at), query_type, result_category, COUNT(*)
+FROM queryhistory
+GROUP BY DATE(created_at), query_type, result_category
+ON DUPLICATE KEY UPDATE count = VALUES(count);
@@ -0,0 +1,8 @@
+-- 识别历史、兑换记录与知识文章的联合索引 (MySQL)
+-- 对应 my_app/models.py 中各模型的 __table_args__。
+-- 执行后可运行 `flask --app run check-query-plans` 确认各业务查询均已使用索引。
+
+CREATE INDEX ix_queryhistory_user_status_created ON queryhistory (user_id, status, created_at);
+CREATE INDEX ix_queryhistory_user_created ON queryhistory (user_id, created_at);
+CREATE INDEX ix_redemptionhistory_user_created ON redemptionhistory (user_id, created_at);
+CREATE INDEX ix_knowledgearticle_status_updated ON knowledgearticle (status, updated_time);
@@ -0,0 +1,16 @@
+-- 识别历史归档表 (MySQL)
+-- 对应 my_app/models.py 中的 QueryHistoryArchive；由 `flask --app run archive-history` 从 queryhistory 迁入数据。
+
+CREATE TABLE IF NOT EXISTS queryhistory_archive (
+    id INT NOT NULL COMMENT '原识别历史记录ID',
+    user_id INT NOT NULL COMMENT '用户ID, 外键, 关联User(id)',
+    query_type VARCHAR(20) NOT NULL COMMENT '查询方式 (''text'' 或 ''image'')',
+    query_content TEXT NOT NULL COMMENT '查询内容 (文字或图片URL)',
+    result_category VARCHAR(50) NOT NULL COMMENT '识别结果分类',
+    created_at DATETIME NOT NULL COMMENT '查询时间',
+    status SMALLINT NOT NULL COMMENT '记录状态 (0: 可查询, 1: 已删除)',
+    archived_at DATETIME NOT NULL COMMENT '归档时间',
+    PRIMARY KEY (id),
+    INDEX ix_queryhistory_archive_user_created (user_id, created_at),
+    FOREIGN KEY (user_id) REFERENCES user (id) ON DELETE CASCADE
+) ROW_FORMAT=COMPRESSED;
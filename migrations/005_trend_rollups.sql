@@ -0,0 +1,33 @@
+-- 识别趋势统计的汇总表 (MySQL)
+-- 对应 my_app/models.py 中的 CategoryHourlyStat、CategoryMonthlyStat、UserDailyActivity 与 ActiveUserStat。
+-- 执行后运行 `flask --app run backfill-rollups` 由已有的识别历史回填，
+-- 之后每小时运行一次 `flask --app run compact-rollups`。
+
+CREATE TABLE IF NOT EXISTS category_hourly_stat (
+    hour DATETIME NOT NULL COMMENT '小时（整点）',
+    query_type VARCHAR(20) NOT NULL COMMENT '查询方式 (''text'' 或 ''image'')',
+    result_category VARCHAR(50) NOT NULL COMMENT '识别结果分类',
+    count INT NOT NULL DEFAULT 0 COMMENT '识别次数',
+    PRIMARY KEY (hour, query_type, result_category)
+);
+
+CREATE TABLE IF NOT EXISTS category_monthly_stat (
+    month DATE NOT NULL COMMENT '月份（当月1日）',
+    query_type VARCHAR(20) NOT NULL COMMENT '查询方式 (''text'' 或 ''image'')',
+    result_category VARCHAR(50) NOT NULL COMMENT '识别结果分类',
+    count INT NOT NULL DEFAULT 0 COMMENT '识别次数',
+    PRIMARY KEY (month, query_type, result_category)
+);
+
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    day DATE NOT NULL COMMENT '日期',
+    user_id INT NOT NULL COMMENT '用户ID',
+    PRIMARY KEY (day, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS active_user_stat (
+    granularity VARCHAR(5) NOT NULL COMMENT '汇总粒度 (''day'' 或 ''month'')',
+    bucket DATE NOT NULL COMMENT '日期，或月份的1日',
+    users INT NOT NULL COMMENT '活跃用户数',
+    PRIMARY KEY (granularity, bucket)
+);
@@ -0,0 +1,12 @@
+-- 数据版本号表 (MySQL)
+-- 对应 my_app/models.py 中的 DataVersion；垃圾物品的写入（含 import-items）会同时把 garbage_item 的版本号加一，
+-- 各 worker 的物品名称索引据此发现其他进程做出的修改。绕过应用直接修改 garbage_item 后，请手动执行：
+--   UPDATE data_version SET version = version + 1 WHERE name = 'garbage_item';
+
+CREATE TABLE IF NOT EXISTS data_version (
+    name VARCHAR(50) NOT NULL COMMENT '数据名称，例如表名',
+    version BIGINT NOT NULL DEFAULT 0 COMMENT '版本号，每次写入加一',
+    PRIMARY KEY (name)
+);
+
+INSERT IGNORE INTO data_version (name, version) VALUES ('garbage_item', 0);
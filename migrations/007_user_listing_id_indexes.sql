@@ -0,0 +1,12 @@
+-- 管理员用户列表的分页索引 (MySQL)
+-- 对应 my_app/models.py 中 User.__table_args__，替换 001 中的索引：
+-- 各筛选索引末尾显式包含 id，按 id 倒序分页时无需文件排序；按积分范围筛选时沿 (points, id) 按积分倒序分页。
+
+CREATE INDEX ix_user_role_id ON `user` (role, id);
+CREATE INDEX ix_user_status_id ON `user` (status, id);
+CREATE INDEX ix_user_role_status_id ON `user` (role, status, id);
+CREATE INDEX ix_user_points_id ON `user` (points, id);
+
+DROP INDEX ix_user_role_status ON `user`;
+DROP INDEX ix_user_status ON `user`;
+DROP INDEX ix_user_points ON `user`;
@@ -0,0 +1,6 @@
+-- 识别历史按时间范围读取的索引 (MySQL)
+-- 对应 my_app/models.py 中 QueryHistory / QueryHistoryArchive 的 __table_args__；
+-- 管理员按日期范围导出全部用户的识别历史时沿 (created_at, id) 做范围扫描，无需读取整张表。
+
+CREATE INDEX ix_queryhistory_created_id ON queryhistory (created_at, id);
+CREATE INDEX ix_queryhistory_archive_created_id ON queryhistory_archive (created_at, id);
@@ -37,4 +37,33 @@ def create_app(config_class=Config):
     app.register_blueprint(history_bp)
     app.register_blueprint(points_bp)
 
+    # 初始化图像识别推理引擎、垃圾物品名称索引、文章全文索引、文章响应缓存、用户名索引与后台写入器
+    from .recognition import image_model
+    from .recognition.text_index import garbage_index
+    from .articles.search_index import article_index
+    from .articles.cache import article_cache
+    from .admin.user_index import username_index
+    from .history.buffer import history_buffer
+    from .recognition.storage import upload_writer
+    image_model.init_app(app)
+    garbage_index.init_app(app)
+    article_index.init_app(app)
+    username_index.init_app(app)
+    history_buffer.init_app(app)
+    upload_writer.init_app(app)
+    article_cache.configure(app.config['ARTICLE_CACHE_SIZE'], app.config['ARTICLE_CACHE_CHECK_INTERVAL'])
+
+    # 注册命令行工具
+    from .recognition.commands import import_items_command
+    from .history.commands import (
+        rebuild_category_stats_command, archive_history_command, compact_rollups_command, backfill_rollups_command
+    )
+    from .query_plans import check_query_plans_command
+    app.cli.add_command(import_items_command)
+    app.cli.add_command(rebuild_category_stats_command)
+    app.cli.add_command(archive_history_command)
+    app.cli.add_command(compact_rollups_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(check_query_plans_command)
+
     return app
\ No newline at end of file
@@ -10,12 +10,32 @@ from .services import (
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 
+def _page_limit():
+    """解析分页参数 limit，不合法时返回 None"""
+    limit = request.args.get('limit', 20, type=int)
+    return limit if 1 <= limit <= 100 else None
+
+
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_users():
-    """获取所有用户列表"""
-    users = get_all_users_service()
-    return jsonify([user.to_dict() for user in users]), 200
+    """按用户ID倒序分页获取用户列表，可按 role、status 筛选；按 min_points、max_points 筛选时按积分倒序"""
+    limit = _page_limit()
+    if limit is None:
+        return jsonify({'message': '参数 "limit" 的取值范围为 1-100'}), 400
+
+    try:
+        users, next_cursor = get_all_users_service(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            role=request.args.get('role', type=int),
+            status=request.args.get('status', type=int),
+            min_points=request.args.get('min_points', type=int),
+            max_points=request.args.get('max_points', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'items': [user.to_dict() for user in users], 'next_cursor': next_cursor}), 200
 
 
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -29,16 +49,26 @@ def get_user_by_id(user_id):
 @admin_bp.route('/users/search', methods=['GET'])
 @admin_required
 def search_users_by_username():
-    """(管理员)根据用户名模糊搜索用户"""
+    """(管理员)根据用户名搜索用户，match=prefix 为前缀匹配，默认为包含匹配，结果分页返回"""
     username_query = request.args.get('username')
     if not username_query:
         return jsonify({'message': '缺少用户名查询参数 "username"'}), 400
 
-    users = search_users_by_username_service(username_query)
-    if not users:
-        return jsonify({'message': '未找到匹配的用户', 'users': []}), 200
-
-    return jsonify([user.to_dict() for user in users]), 200
+    match = request.args.get('match', 'substring')
+    if match not in ('prefix', 'substring'):
+        return jsonify({'message': '参数 "match" 只能为 prefix 或 substring'}), 400
+
+    limit = _page_limit()
+    if limit is None:
+        return jsonify({'message': '参数 "limit" 的取值范围为 1-100'}), 400
+
+    try:
+        users, next_cursor = search_users_by_username_service(
+            username_query, limit, request.args.get('cursor'), match
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'items': [user.to_dict() for user in users], 'next_cursor': next_cursor}), 200
 
 
 @admin_bp.route('/users/<int:user_id>/status', methods=['PUT'])
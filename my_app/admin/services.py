@@ -1,10 +1,35 @@
 # my_app/admin/services.py
+from .user_index import username_index
 from ..models import db, User, bcrypt
+from ..pagination import encode_cursor, decode_cursor, keyset_after, paginate_keyset
+from ..sql_utils import starts_with
 
 
-def get_all_users_service():
-    """获取所有用户的业务逻辑"""
-    return User.query.all()
+def get_all_users_service(limit=20, cursor=None, role=None, status=None, min_points=None, max_points=None):
+    """
+    按用户ID倒序分页获取用户列表，可按角色、状态与积分范围筛选。
+    按积分范围筛选时改为按 (积分, 用户ID) 倒序分页，以便沿 (points, id) 索引做范围扫描而无需重新排序
+    :return: (users, next_cursor)
+    :raises ValueError: 游标不合法
+    """
+    query = User.query
+    if role is not None:
+        query = query.filter(User.role == role)
+    if status is not None:
+        query = query.filter(User.status == status)
+    if min_points is not None:
+        query = query.filter(User.points >= min_points)
+    if max_points is not None:
+        query = query.filter(User.points <= max_points)
+
+    if min_points is not None or max_points is not None:
+        columns, sort_key = (User.points, User.id), lambda user: (user.points, user.id)
+    else:
+        columns, sort_key = (User.id,), lambda user: (user.id,)
+    if cursor:
+        query = query.filter(keyset_after(columns, decode_cursor(cursor, (int,) * len(columns))))
+
+    return paginate_keyset(query.order_by(*(column.desc() for column in columns)), limit, sort_key)
 
 
 def get_user_by_id_service(user_id):
@@ -12,10 +37,33 @@ def get_user_by_id_service(user_id):
     return User.query.get_or_404(user_id)
 
 
-def search_users_by_username_service(username_query):
-    """根据用户名模糊搜索用户的业务逻辑"""
-    search_term = f"%{username_query}%"
-    return User.query.filter(User.username.ilike(search_term)).all()
+def search_users_by_username_service(username_query, limit=20, cursor=None, match='substring'):
+    """
+    根据用户名搜索用户的业务逻辑
+      - prefix: 用户名以 username_query 开头，走数据库中用户名的唯一索引，按用户名排序
+      - substring: 用户名包含 username_query，走内存中的子串索引，按用户名长度、用户ID排序
+    :return: (users, next_cursor)
+    :raises ValueError: 游标不合法
+    """
+    if match == 'prefix':
+        query = User.query.filter(starts_with(User.username, username_query))
+        if cursor:
+            query = query.filter(keyset_after((User.username,), decode_cursor(cursor, (str,)), descending=False))
+        return paginate_keyset(query.order_by(User.username), limit, lambda user: (user.username,))
+
+    after = decode_cursor(cursor, (int, int)) if cursor else None
+    # 多取一个以判断是否还有下一页
+    hits = username_index.search(username_query, limit + 1, after)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        user_id, length = hits[-1]
+        next_cursor = encode_cursor(length, user_id)
+
+    # 按主键取回本页用户，保持索引给出的顺序
+    users_by_id = {user.id: user for user in User.query.filter(User.id.in_([user_id for user_id, _ in hits]))}
+    users = [users_by_id[user_id] for user_id, _ in hits if user_id in users_by_id]
+    return users, next_cursor
 
 
 def update_user_status_service(user_id, new_status):
@@ -0,0 +1,94 @@
+# my_app/admin/user_index.py
+from sqlalchemy import event, func, inspect
+
+from ..index_sync import PendingChanges, SnapshotIndex
+from ..models import db, User
+from ..ngram_index import NgramIndex
+
+
+class UsernameIndex(SnapshotIndex):
+    """
+    用户名的进程内子串索引，供管理员按用户名模糊搜索，不再对 user 表做 LIKE '%q%' 全表扫描。
+    一致性保证见 SnapshotIndex，数据库指纹为 (记录数, 最大ID)。
+    """
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('USER_INDEX_CHECK_INTERVAL', 30)
+
+    def _empty_snapshot(self):
+        return NgramIndex()
+
+    def _db_fingerprint(self):
+        return tuple(db.session.query(func.count(User.id), func.max(User.id)).one())
+
+    def _build_snapshot(self):
+        index = NgramIndex()
+        index.build(db.session.query(User.id, User.username).execution_options(yield_per=10000))
+        return index
+
+    def _needs_rebuild(self):
+        return self._snapshot.stale_ratio > 0.2
+
+    def upsert(self, user_id, username):
+        """应用本进程已提交的注册或改名，并同步推算新的数据库指纹"""
+        index = self._snapshot
+        if index.text(user_id) is None and self._fingerprint is not None:
+            count, max_id = self._fingerprint
+            self._fingerprint = (count + 1, max(max_id or 0, user_id))
+        index.add(user_id, username)
+
+    def remove(self, user_id):
+        """应用本进程已提交的删除；删除的恰好是最大ID时无法推算指纹，留待下次检查时重建"""
+        index = self._snapshot
+        if index.text(user_id) is not None and self._fingerprint is not None:
+            count, max_id = self._fingerprint
+            self._fingerprint = (count - 1, max_id) if user_id != max_id else None
+        index.remove(user_id)
+
+    def search(self, query, limit, after=None):
+        """
+        按 (用户名长度, 用户ID) 升序返回用户名包含 query 的用户ID
+        :param after: 上一页最后一个用户的 (用户名长度, 用户ID)
+        :return: [(user_id, username_length), ...]，最多 limit 个
+        """
+        self.ensure_fresh()
+        results = []
+        for user_id, username in self._snapshot.search(query, after):
+            results.append((user_id, len(username)))
+            if len(results) == limit:
+                break
+        return results
+
+
+username_index = UsernameIndex()
+
+
+def _apply_changes(changes, context):
+    if not username_index._loaded:
+        return
+    for op, user_id, username in changes:
+        if op == 'upsert':
+            username_index.upsert(user_id, username)
+        else:
+            username_index.remove(user_id)
+
+
+# --- 本进程内通过 ORM 的修改：先记录在会话中，事务提交后再应用到索引 ---
+_changes = PendingChanges('username_index_changes', _apply_changes)
+
+
+@event.listens_for(User, 'after_insert')
+def _after_insert(mapper, connection, target):
+    _changes.record(connection, target, ('upsert', target.id, target.username))
+
+
+@event.listens_for(User, 'after_update')
+def _after_update(mapper, connection, target):
+    # 积分、状态等字段的更新非常频繁，只有用户名变化时才需要更新索引
+    if inspect(target).attrs.username.history.has_changes():
+        _changes.record(connection, target, ('upsert', target.id, target.username))
+
+
+@event.listens_for(User, 'after_delete')
+def _after_delete(mapper, connection, target):
+    _changes.record(connection, target, ('delete', target.id, target.username))
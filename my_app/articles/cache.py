@@ -0,0 +1,110 @@
+# my_app/articles/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from .search_index import article_fingerprint, advance_fingerprint
+
+
+class ArticleResponseCache:
+    """
+    公开文章接口的响应缓存，带容量上限 (LRU)。
+    缓存项为已序列化的响应体及其 ETag / Last-Modified，命中时不访问数据库。
+
+    失效规则：
+      - 本进程内通过文章服务的新增、修改、删除：精确删除该文章的详情缓存，
+        并清空列表与搜索结果的缓存（它们可能包含任意文章）；
+      - 其他进程造成的变化：每隔 check_interval 秒比对一次数据库指纹，不一致时清空全部缓存。
+
+    每次失效都会使代数 (generation) 加一。调用方在查询数据库之前取得代数并随缓存项一并交给 put，
+    查询期间发生过失效时不写入，避免把失效之前查到的旧响应重新放回缓存。
+    """
+
+    def __init__(self, max_entries=1024, check_interval=5.0):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._generation = 0
+        self.configure(max_entries, check_interval)
+
+    def configure(self, max_entries, check_interval):
+        with self._lock:
+            self.max_entries = max(0, int(max_entries))
+            self.check_interval = float(check_interval)
+            self._entries.clear()
+            self._fingerprint = None
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+    def ensure_fresh(self):
+        """
+        在检查间隔到期后比对数据库指纹，需要在应用上下文中调用。
+        :return: 当前的数据库指纹 (记录数, 最大ID, 最近修改时间)
+        """
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._last_check < self.check_interval:
+            return self._fingerprint
+
+        fingerprint = article_fingerprint()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._entries.clear()
+                self._generation += 1
+            self._fingerprint = fingerprint
+            self._last_check = now
+        return fingerprint
+
+    def generation(self):
+        """当前的缓存代数，在构建缓存项之前取得，写入时传给 put"""
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry, generation):
+        """
+        写入缓存项；构建期间缓存已失效（代数已变化）时放弃写入
+        :return: 是否已写入
+        """
+        if self.max_entries == 0:
+            return False
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate_article(self, article, created=False):
+        """应用本进程已提交的文章写入：删除该文章的详情缓存与全部列表、搜索缓存"""
+        with self._lock:
+            self._entries = OrderedDict(
+                (key, entry) for key, entry in self._entries.items()
+                if key[0] == 'detail' and key[1] != article.id
+            )
+            self._generation += 1
+            self._fingerprint = advance_fingerprint(self._fingerprint, article, created)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# 全局响应缓存实例，由 create_app 按配置设置容量
+article_cache = ArticleResponseCache()
@@ -1,8 +1,12 @@
 # my_app/articles/routes.py
-from flask import Blueprint, jsonify, request, g
+import hashlib
+from datetime import timezone
+from flask import Blueprint, jsonify, request, g, current_app
+from .cache import article_cache
 from .services import (
     get_published_articles_service,
     search_articles_by_title_service,
+    fulltext_search_articles_service,
     get_published_article_detail_service,
     create_article_service,
     update_article_service,
@@ -13,12 +17,59 @@ from ..decorators import admin_required
 articles_bp = Blueprint('articles', __name__, url_prefix='/api/articles')
 
 
+def _cached_json(key, build):
+    """
+    带服务端缓存与条件请求 (ETag / Last-Modified → 304) 的 JSON 响应。
+    :param key: 缓存键，详情为 ('detail', 文章ID)，列表与搜索为 (类型, 查询参数...)
+    :param build: 缓存未命中时调用，返回 (payload, last_modified)；
+                  last_modified 为 None 时取文章表的最近修改时间
+    """
+    fingerprint = article_cache.ensure_fresh()
+    entry = article_cache.get(key)
+    if entry is None:
+        # 在查询之前取得代数：查询期间有文章写入时，put 不会存入这份可能过期的响应
+        generation = article_cache.generation()
+        payload, last_modified = build()
+        if last_modified is None:
+            # 列表与搜索结果可能因任意文章的变化而变化，以整张表的指纹作为版本
+            last_modified = fingerprint[2]
+            version = repr((key, fingerprint))
+        else:
+            version = repr((key, last_modified))
+        etag = hashlib.sha1(version.encode('utf-8')).hexdigest()[:20]
+        entry = (current_app.json.response(payload).get_data(), etag, last_modified)
+        article_cache.put(key, entry, generation)
+
+    body, etag, last_modified = entry
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.set_etag(etag)
+    if last_modified is not None:
+        # updated_time 为服务器本地时间，转换为 UTC 后写入响应头
+        response.last_modified = last_modified.astimezone(timezone.utc)
+    # 允许浏览器与代理缓存，但每次使用前都需验证，内容未变化时返回 304
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 # (无需登录)
 @articles_bp.route('/get', methods=['GET'])
 def get_article_list():
-    """获取已发布的文章列表"""
-    articles = get_published_articles_service()
-    return jsonify([article.to_dict() for article in articles]), 200
+    """按修改时间倒序分页获取已发布的文章列表（标题、摘要与作者），通过 cursor 获取下一页"""
+    limit = request.args.get('limit', 20, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({'message': '参数 "limit" 的取值范围为 1-100'}), 400
+
+    cursor = request.args.get('cursor')
+
+    def build():
+        items, next_cursor = get_published_articles_service(limit, cursor)
+        return {'items': items, 'next_cursor': next_cursor}, None
+
+    try:
+        return _cached_json(('list', limit, cursor), build)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
 
 @articles_bp.route('/search', methods=['GET'])
@@ -29,15 +80,36 @@ def search_articles():
     if not title_query:
         return jsonify({'message': '缺少标题查询参数 "title"'}), 400
 
-    articles = search_articles_by_title_service(title_query)
-    return jsonify([article.to_dict() for article in articles]), 200
+    def build():
+        articles = search_articles_by_title_service(title_query)
+        return [article.to_dict() for article in articles], None
+
+    return _cached_json(('search', title_query), build)
+
+
+@articles_bp.route('/search/fulltext', methods=['GET'])
+def fulltext_search_articles():
+    """在文章标题与正文中全文检索，按相关度排序并返回高亮片段"""
+    query = request.args.get('q', type=str)
+    if not query or not query.strip():
+        return jsonify({'message': '缺少查询参数 "q"'}), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= 50:
+        return jsonify({'message': '参数 "limit" 的取值范围为 1-50'}), 400
+
+    results = fulltext_search_articles_service(query, limit)
+    return jsonify({'query': query, 'results': results}), 200
 
 
 @articles_bp.route('/get/<int:article_id>', methods=['GET'])
 def get_article_detail(article_id):
     """获取单篇已发布的文章详情"""
-    article = get_published_article_detail_service(article_id)
-    return jsonify(article.to_dict()), 200
+    def build():
+        article = get_published_article_detail_service(article_id)
+        return article.to_dict(), article.updated_time
+
+    return _cached_json(('detail', article_id), build)
 
 
 @articles_bp.route('/create', methods=['POST'])
@@ -0,0 +1,237 @@
+# my_app/articles/search_index.py
+import heapq
+import math
+import re
+
+from markupsafe import escape
+from sqlalchemy import func
+
+from ..index_sync import SnapshotIndex
+from ..models import db, KnowledgeArticle
+
+# 连续的汉字，或连续的字母数字
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fff]+|[0-9a-z]+')
+
+# 标题中的词项权重高于正文
+TITLE_WEIGHT = 3
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 文档频率不超过该值的词项才用于生成候选集
+CANDIDATE_POSTING_LIMIT = 2000
+
+
+def tokenize(text):
+    """
+    分词：汉字按相邻两字切分为二元组（单字成段时保留单字），字母数字按整词切分，不区分大小写
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text.casefold()):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def highlight(text, terms, max_length=None):
+    """
+    将 text 中出现的 terms 用 <em></em> 标出，其余内容做 HTML 转义。
+    指定 max_length 时，截取第一个命中位置附近的片段。
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = text
+    marks = [False] * len(text)
+    first = None
+    for term in terms:
+        start = lowered.find(term)
+        while start != -1:
+            first = start if first is None else min(first, start)
+            for i in range(start, start + len(term)):
+                marks[i] = True
+            start = lowered.find(term, start + 1)
+
+    begin, end = 0, len(text)
+    if max_length is not None and len(text) > max_length:
+        begin = max(0, (first or 0) - max_length // 4)
+        end = min(len(text), begin + max_length)
+
+    parts = ['…'] if begin > 0 else []
+    i = begin
+    while i < end:
+        j = i
+        while j < end and marks[j] == marks[i]:
+            j += 1
+        segment = str(escape(text[i:j]))
+        parts.append(f'<em>{segment}</em>' if marks[i] else segment)
+        i = j
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def article_fingerprint():
+    """文章表的数据库指纹 (记录数, 最大ID, 最近修改时间)；新增、修改与逻辑删除都会改变它"""
+    return tuple(db.session.query(
+        func.count(KnowledgeArticle.id), func.max(KnowledgeArticle.id), func.max(KnowledgeArticle.updated_time)
+    ).one())
+
+
+def advance_fingerprint(fingerprint, article, created=False):
+    """根据本进程刚提交的一次文章写入推算新的数据库指纹，无需再查询数据库"""
+    if fingerprint is None:
+        return None
+    count, max_id, max_updated = fingerprint
+    return (
+        count + 1 if created else count,
+        max(max_id or 0, article.id),
+        max(max_updated, article.updated_time) if max_updated else article.updated_time,
+    )
+
+
+class _Corpus:
+    """一次完整构建得到的倒排列表与文档长度，整体替换，查询时只读取一次"""
+    __slots__ = ('postings', 'doc_terms', 'doc_lengths', 'total_length')
+
+    def __init__(self, postings, doc_terms, doc_lengths):
+        self.postings = postings
+        self.doc_terms = doc_terms
+        self.doc_lengths = doc_lengths
+        self.total_length = sum(doc_lengths.values())
+
+
+class ArticleSearchIndex(SnapshotIndex):
+    """
+    已发布知识文章（标题 + 正文）的进程内倒排索引，按 BM25 计算相关度。
+    倒排列表记录 词项 -> {文章ID: 加权词频}，查询只访问查询词项对应的倒排列表，
+    与文章总数无关；文章正文不常驻内存，高亮片段由命中的前 limit 篇文章按主键取回后生成。
+
+    一致性保证见 SnapshotIndex：本进程内通过文章服务的新增、修改、删除在提交后由 apply() 增量更新，
+    数据库指纹为 (记录数, 最大ID, 最近修改时间)。
+    """
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('ARTICLE_INDEX_CHECK_INTERVAL', 30)
+
+    @staticmethod
+    def _weighted_terms(title, content):
+        terms = {}
+        for token in tokenize(title):
+            terms[token] = terms.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(content):
+            terms[token] = terms.get(token, 0) + 1
+        return terms
+
+    def _add_doc(self, article_id, title, content):
+        """调用方需持有锁"""
+        self._remove_doc(article_id)
+        corpus = self._snapshot
+        terms = self._weighted_terms(title, content)
+        for term, tf in terms.items():
+            # 写时复制：替换为新字典，正在遍历旧字典的查询不受影响
+            posting = dict(corpus.postings.get(term, ()))
+            posting[article_id] = tf
+            corpus.postings[term] = posting
+        corpus.doc_terms[article_id] = tuple(terms)
+        length = sum(terms.values())
+        corpus.doc_lengths[article_id] = length
+        corpus.total_length += length
+
+    def _remove_doc(self, article_id):
+        """调用方需持有锁"""
+        corpus = self._snapshot
+        for term in corpus.doc_terms.pop(article_id, ()):
+            posting = dict(corpus.postings[term])
+            posting.pop(article_id, None)
+            if posting:
+                corpus.postings[term] = posting
+            else:
+                del corpus.postings[term]
+        corpus.total_length -= corpus.doc_lengths.pop(article_id, 0)
+
+    def _empty_snapshot(self):
+        return _Corpus({}, {}, {})
+
+    def _db_fingerprint(self):
+        return article_fingerprint()
+
+    def _build_snapshot(self):
+        rows = db.session.query(KnowledgeArticle.id, KnowledgeArticle.title, KnowledgeArticle.content) \
+            .filter(KnowledgeArticle.status == 0).execution_options(yield_per=1000)
+
+        postings, doc_terms, doc_lengths = {}, {}, {}
+        for article_id, title, content in rows:
+            terms = self._weighted_terms(title, content)
+            for term, tf in terms.items():
+                postings.setdefault(term, {})[article_id] = tf
+            doc_terms[article_id] = tuple(terms)
+            doc_lengths[article_id] = sum(terms.values())
+        return _Corpus(postings, doc_terms, doc_lengths)
+
+    def apply(self, article, created=False):
+        """
+        应用本进程已提交的新增、修改或逻辑删除，并同步推算新的数据库指纹。
+        需在提交之后调用，此时 article 的字段已与数据库一致。
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            if article.status == 0:
+                self._add_doc(article.id, article.title, article.content)
+            else:
+                self._remove_doc(article.id)
+
+            self._fingerprint = advance_fingerprint(self._fingerprint, article, created)
+
+    def search(self, query, limit=10):
+        """
+        :return: [(article_id, score), ...]，按 BM25 得分降序
+        """
+        self.ensure_fresh()
+        terms = set(tokenize(query))
+        corpus = self._snapshot
+        postings = corpus.postings
+        doc_lengths = corpus.doc_lengths
+        n_docs = len(doc_lengths)
+        if not terms or not n_docs:
+            return []
+        avg_length = corpus.total_length / n_docs
+
+        # 只从较稀有词项的倒排列表中取候选文章，再逐个累加全部词项的得分；
+        # 几乎每篇文章都包含的常见词项只参与计分，不参与扩大候选集，查询耗时不随文章总数线性增长
+        postings_by_df = sorted((p for p in (postings.get(term) for term in terms) if p), key=len)
+        if not postings_by_df:
+            return []
+        candidate_postings = [p for p in postings_by_df if len(p) <= CANDIDATE_POSTING_LIMIT] or postings_by_df[:1]
+        candidates = set().union(*candidate_postings)
+
+        weights = []
+        for posting in postings_by_df:
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            weights.append((posting, idf))
+
+        scores = {}
+        for article_id in candidates:
+            length_norm = K1 * (1 - B + B * doc_lengths.get(article_id, avg_length) / avg_length)
+            score = 0.0
+            for posting, idf in weights:
+                tf = posting.get(article_id)
+                if tf:
+                    score += idf * tf * (K1 + 1) / (tf + length_norm)
+            scores[article_id] = score
+
+        return heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+
+    def stats(self):
+        corpus = self._snapshot
+        return {
+            'loaded': self._loaded,
+            'articles': len(corpus.doc_lengths),
+            'terms': len(corpus.postings),
+        }
+
+
+article_index = ArticleSearchIndex()
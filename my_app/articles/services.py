@@ -1,16 +1,89 @@
 # my_app/articles/services.py
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from .cache import article_cache
+from .search_index import article_index, tokenize, highlight
 from ..models import db, KnowledgeArticle, User
+from ..pagination import decode_cursor, keyset_after, paginate_keyset
 
+# 文章列表中正文摘要的长度（字符数）
+EXCERPT_LENGTH = 100
 
-def get_published_articles_service():
-    """获取所有已发布的文章"""
-    return KnowledgeArticle.query.order_by(KnowledgeArticle.updated_time.desc()).all()
+
+def get_published_articles_service(limit=20, cursor=None):
+    """
+    按修改时间倒序分页获取已发布文章的列表摘要。
+    只查询标题、正文开头的摘要与作者名（同一次关联查询），不读取正文全文。
+    :return: (items, next_cursor)
+    :raises ValueError: 游标不合法
+    """
+    query = db.session.query(
+        KnowledgeArticle.id,
+        KnowledgeArticle.title,
+        func.substr(KnowledgeArticle.content, 1, EXCERPT_LENGTH + 1).label('excerpt'),
+        KnowledgeArticle.author_id,
+        User.username.label('author_name'),
+        KnowledgeArticle.updated_time
+    ).outerjoin(User, KnowledgeArticle.author_id == User.id) \
+        .filter(KnowledgeArticle.status == 0)
+
+    sort_columns = (KnowledgeArticle.updated_time, KnowledgeArticle.id)
+    if cursor:
+        query = query.filter(keyset_after(sort_columns, decode_cursor(cursor, (datetime, int))))
+    query = query.order_by(KnowledgeArticle.updated_time.desc(), KnowledgeArticle.id.desc())
+
+    rows, next_cursor = paginate_keyset(query, limit, lambda row: (row.updated_time, row.id))
+    items = [{
+        'id': row.id,
+        'title': row.title,
+        # 多取一个字符，用于判断正文是否被截断
+        'excerpt': row.excerpt[:EXCERPT_LENGTH] + '…' if len(row.excerpt) > EXCERPT_LENGTH else row.excerpt,
+        'author_id': row.author_id,
+        'author_name': row.author_name or 'N/A',
+        'updated_time': row.updated_time.strftime('%Y-%m-%d %H:%M:%S'),
+    } for row in rows]
+    return items, next_cursor
 
 
 def search_articles_by_title_service(title_query):
     """根据标题模糊搜索文章"""
     search_term = f"%{title_query}%"
-    return KnowledgeArticle.query.filter(KnowledgeArticle.title.ilike(search_term)).all()
+    return KnowledgeArticle.query.filter(
+        KnowledgeArticle.status == 0,
+        KnowledgeArticle.title.ilike(search_term)
+    ).all()
+
+
+def fulltext_search_articles_service(query, limit=10):
+    """
+    在已发布文章的标题与正文中全文检索，按相关度返回前 limit 篇，并附带高亮的标题与正文片段
+    """
+    hits = article_index.search(query, limit)
+    if not hits:
+        return []
+
+    # 只按主键取回命中的文章，作者在同一次查询中关联加载
+    articles = KnowledgeArticle.query.options(joinedload(KnowledgeArticle.author)) \
+        .filter(KnowledgeArticle.id.in_([article_id for article_id, _ in hits]), KnowledgeArticle.status == 0).all()
+    by_id = {article.id: article for article in articles}
+
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    results = []
+    for article_id, score in hits:
+        article = by_id.get(article_id)
+        if article is None:
+            continue
+        results.append({
+            'id': article.id,
+            'title': article.title,
+            'author_name': article.author.username if article.author else 'N/A',
+            'updated_time': article.updated_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'score': round(score, 4),
+            'title_highlight': highlight(article.title, terms),
+            'snippet': highlight(article.content, terms, max_length=120),
+        })
+    return results
 
 
 def get_published_article_detail_service(article_id):
@@ -27,6 +100,8 @@ def create_article_service(title, content, author_id):
     )
     db.session.add(new_article)
     db.session.commit()
+    article_index.apply(new_article, created=True)
+    article_cache.invalidate_article(new_article, created=True)
     return new_article
 
 
@@ -36,6 +111,8 @@ def update_article_service(article_id, data):
     article.title = data.get('title', article.title)
     article.content = data.get('content', article.content)
     db.session.commit()
+    article_index.apply(article)
+    article_cache.invalidate_article(article)
     return article
 
 
@@ -44,4 +121,6 @@ def delete_article_service(article_id):
     article = KnowledgeArticle.query.get_or_404(article_id)
     article.status = 1  # 逻辑删除
     db.session.commit()
-    return article
\ No newline at end of file
+    article_index.apply(article)
+    article_cache.invalidate_article(article)
+    return article
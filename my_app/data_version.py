@@ -0,0 +1,22 @@
+# my_app/data_version.py
+from sqlalchemy import select
+
+from .models import db, DataVersion
+from .sql_utils import upsert_statement
+
+
+def bump_data_version(name, connection=None):
+    """
+    在当前事务中把 name 的版本号加一（首次写入时创建为 1），返回加一后的版本号。
+    版本号所在行会一直锁定到事务结束，因此同一数据的写入事务得到的版本号连续且不重复。
+    :param connection: 在 ORM 的 flush 事件中调用时传入事件提供的连接，否则使用 db.session
+    """
+    executor = connection if connection is not None else db.session
+    stmt = upsert_statement(DataVersion, ['name'], increment_columns=['version'])
+    executor.execute(stmt, [{'name': name, 'version': 1}])
+    return executor.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar()
+
+
+def get_data_version(name):
+    """当前已提交的版本号，尚未写入过时为 0"""
+    return db.session.query(DataVersion.version).filter_by(name=name).scalar() or 0
@@ -0,0 +1,244 @@
+# my_app/fuzzy_index.py
+import itertools
+import threading
+from functools import lru_cache
+
+try:
+    from pypinyin import pinyin as _pinyin, Style
+except ImportError:  # 拼音匹配为可选依赖，缺失时只做编辑距离匹配
+    _pinyin = None
+
+# 多音字组合出的拼音写法数量上限
+MAX_PINYIN_READINGS = 4
+
+
+def edit_distance(a, b, max_distance):
+    """
+    限定上界的编辑距离（相邻字符交换计为一次编辑）。
+    距离超过 max_distance 时提前返回 max_distance + 1。
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev_prev[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return min(prev[-1], max_distance + 1)
+
+
+def allowed_distance(length, max_distance):
+    """按查询串长度放宽容错：2 个字符以内不容错，3-5 个字符容错 1 次，更长容错 2 次"""
+    if length <= 2:
+        return 0
+    return min(max_distance, 1 if length <= 5 else 2)
+
+
+def _is_cjk(ch):
+    return '\u4e00' <= ch <= '\u9fff'
+
+
+@lru_cache(maxsize=None)
+def _char_readings(ch):
+    """单个汉字的全部不带声调读音；逐字查表并缓存，比按词组分词快一个数量级"""
+    readings = _pinyin(ch, style=Style.NORMAL, heteronym=True)[0]
+    return tuple(dict.fromkeys(readings))
+
+
+def to_pinyin(text):
+    """
+    返回 text 的拼音写法列表 [(全拼, 首字母), ...]，多音字最多组合出 MAX_PINYIN_READINGS 种；
+    不含汉字或未安装 pypinyin 时返回空列表
+    """
+    if _pinyin is None or not any(_is_cjk(ch) for ch in text):
+        return []
+    syllables = [_char_readings(ch) if _is_cjk(ch) else (ch,) for ch in text if ch.isalnum()]
+    readings = []
+    for combo in itertools.islice(itertools.product(*syllables), MAX_PINYIN_READINGS):
+        readings.append((''.join(combo), ''.join(s[0] for s in combo)))
+    return readings
+
+
+class FuzzyIndex:
+    """
+    内存中的容错索引，在子串匹配落空时使用，支持两类匹配：
+
+      - 编辑距离：SymSpell 风格的删除索引。为每个名称前 prefix_length 个字符
+        生成删除至多 max_distance 个字符后的所有变体，查询时只需生成查询串的删除变体
+        并逐个查表，再用编辑距离校验候选项。
+      - 拼音：按全拼与首字母建立精确索引（需要安装 pypinyin），
+        既能匹配 "dianchi"、"dc" 这样的拼音输入，也能匹配 "电驰" 这样的同音错字。
+
+    查询代价只与查询串长度及命中的候选数有关（候选数另有 max_candidates 上限），
+    未命中的查询与命中的查询开销相当，不会退化为全量扫描。
+    """
+
+    def __init__(self, max_distance=1, prefix_length=7, pinyin=True, max_candidates=5000):
+        self.max_distance = max(0, min(2, int(max_distance)))
+        self.prefix_length = prefix_length
+        self.pinyin = pinyin and _pinyin is not None
+        self.max_candidates = max_candidates
+
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._pinyins = {}
+        self._deletes = {}
+        self._pinyin_keys = {}
+
+    @staticmethod
+    def normalize(text):
+        return text.casefold()
+
+    def _delete_variants(self, word, max_distance):
+        """word 前缀删除至多 max_distance 个字符后的全部变体（含其本身），变体长度不少于 2"""
+        word = word[:self.prefix_length]
+        variants = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            next_frontier = set()
+            for w in frontier:
+                if len(w) <= 2:
+                    continue
+                for i in range(len(w)):
+                    next_frontier.add(w[:i] + w[i + 1:])
+            variants |= next_frontier
+            frontier = next_frontier
+        return variants
+
+    def __len__(self):
+        return len(self._texts)
+
+    @staticmethod
+    def _append(mapping, key, doc_id):
+        # 单个文档时直接存整数，多个文档时存元组，以节省内存；更新时整体替换，遍历中的查询不受影响
+        existing = mapping.get(key)
+        if existing is None:
+            mapping[key] = doc_id
+        elif isinstance(existing, tuple):
+            if doc_id not in existing:
+                mapping[key] = existing + (doc_id,)
+        elif existing != doc_id:
+            mapping[key] = (existing, doc_id)
+
+    @staticmethod
+    def _ids(mapping, key):
+        value = mapping.get(key)
+        if value is None:
+            return ()
+        return value if isinstance(value, tuple) else (value,)
+
+    def _index_doc(self, doc_id, norm, deletes, pinyin_keys, pinyins):
+        for variant in self._delete_variants(norm, self.max_distance):
+            self._append(deletes, variant, doc_id)
+        if self.pinyin:
+            readings = to_pinyin(norm)
+            if readings:
+                pinyins[doc_id] = readings
+                for key in {key for reading in readings for key in reading}:
+                    self._append(pinyin_keys, key, doc_id)
+
+    def build(self, docs):
+        """用 (doc_id, text) 序列整体重建索引"""
+        texts, pinyins, deletes, pinyin_keys = {}, {}, {}, {}
+        for doc_id, text in docs:
+            norm = self.normalize(text)
+            texts[doc_id] = norm
+            self._index_doc(doc_id, norm, deletes, pinyin_keys, pinyins)
+
+        with self._lock:
+            self._texts = texts
+            self._pinyins = pinyins
+            self._deletes = deletes
+            self._pinyin_keys = pinyin_keys
+
+    def add(self, doc_id, text):
+        """新增或更新一个文档；旧名称遗留的索引项在查询时被校验过滤"""
+        norm = self.normalize(text)
+        with self._lock:
+            if self._texts.get(doc_id) == norm:
+                return
+            self._texts[doc_id] = norm
+            self._pinyins.pop(doc_id, None)
+            self._index_doc(doc_id, norm, self._deletes, self._pinyin_keys, self._pinyins)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._texts.pop(doc_id, None)
+            self._pinyins.pop(doc_id, None)
+
+    def _edit_matches(self, q, scores):
+        distance = allowed_distance(len(q), self.max_distance)
+        if distance == 0:
+            return
+
+        texts = self._texts
+        seen = set()
+        for variant in self._delete_variants(q, distance):
+            for doc_id in self._ids(self._deletes, variant):
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                if len(seen) > self.max_candidates:
+                    return
+                text = texts.get(doc_id)
+                if text is None:
+                    continue
+                d = edit_distance(q, text, distance)
+                if 0 < d <= distance:
+                    score = 0.9 * (1 - d / max(len(q), len(text)))
+                    scores[doc_id] = max(scores.get(doc_id, 0.0), score)
+
+    def _pinyin_matches(self, q, scores):
+        if not self.pinyin:
+            return
+        readings = to_pinyin(q)
+        if readings:
+            # 汉字查询：按全拼匹配同音错字
+            candidates = [(full, 0, 0.8) for full, _ in readings]
+        else:
+            # 拼音查询：全拼或首字母
+            key = q.replace(' ', '')
+            if not key.isascii() or not key.isalpha():
+                return
+            candidates = [(key, 0, 0.8)]
+            if len(key) >= 2:
+                candidates.append((key, 1, 0.5))
+
+        for key, field, score in candidates:
+            for doc_id in self._ids(self._pinyin_keys, key):
+                doc_readings = self._pinyins.get(doc_id, ())
+                if any(r[field] == key for r in doc_readings) and self._texts.get(doc_id) != q:
+                    scores[doc_id] = max(scores.get(doc_id, 0.0), score)
+
+    def search(self, query, limit=10):
+        """
+        返回容错匹配得分最高的 limit 个文档，得分均小于 1（低于任何子串匹配）：
+          - 编辑距离: 0.9 * (1 - 距离 / 较长串的长度)
+          - 全拼相同: 0.8
+          - 首字母相同: 0.5
+        :return: [(doc_id, score), ...]，按得分降序，同分时名称更短、ID 更小者优先
+        """
+        q = self.normalize(query).strip()
+        if not q or limit <= 0:
+            return []
+
+        scores = {}
+        self._edit_matches(q, scores)
+        self._pinyin_matches(q, scores)
+
+        texts = self._texts
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], len(texts.get(kv[0], '')), kv[0]))
+        return ranked[:limit]
@@ -0,0 +1,197 @@
+# my_app/history/buffer.py
+import atexit
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import OperationalError
+
+from ..process_local import ProcessLocal
+
+
+class HistoryBuffer:
+    """
+    识别历史与积分的写后缓冲 (write-behind)。
+    开启后，识别请求只把历史事件放入进程内缓冲即可返回；后台线程每隔 flush_interval 秒，
+    或缓冲达到 flush_size 条时，把缓冲中的事件在一个事务中批量写入：
+    批量插入识别历史、按用户合并后的积分增量、按日期累加的分类统计。
+
+    代价是历史记录与积分最多滞后约 flush_interval 秒才能查到；进程被强制杀死 (SIGKILL) 时，
+    尚未写入的事件会丢失。正常退出（包括 gunicorn 的平滑重启）时会先写完缓冲。
+
+    整批写入连续失败 max_attempts 次后，把这批事件逐层二分分别写入，以找出本身无法写入的事件
+    （例如用户已被删除）；单条仍写入失败的事件被丢弃并记录日志，不再阻塞之后的所有写入。
+    数据库不可用 (OperationalError) 时不拆分，整批保留重试。
+    """
+
+    def __init__(self, flush_interval=1.0, flush_size=500, max_pending=50000, max_attempts=3):
+        self.enabled = False
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # 保证同一时刻只有一个线程在写数据库，写入失败的事件按原顺序放回缓冲
+        self._flush_lock = threading.Lock()
+        self._events = []
+        self._worker = ProcessLocal(self._start, lock=self._lock)
+        self._closed = False
+        self._consecutive_failures = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get('HISTORY_WRITE_MODE', 'sync') == 'buffered'
+        self.flush_interval = app.config.get('HISTORY_FLUSH_INTERVAL', 1.0)
+        self.flush_size = app.config.get('HISTORY_FLUSH_SIZE', 500)
+        self.max_pending = app.config.get('HISTORY_BUFFER_MAX_PENDING', 50000)
+        self.max_attempts = app.config.get('HISTORY_FLUSH_MAX_ATTEMPTS', 3)
+
+    def _start(self):
+        # 在 self._lock 内调用：fork 前父进程缓冲中的事件由父进程自己写入，子进程从空缓冲开始
+        self._events = []
+        self._closed = False
+        worker = threading.Thread(target=self._run, name='history-flusher', daemon=True)
+        worker.start()
+        return worker
+
+    def submit(self, user_id, query_type, entries, created_at):
+        """
+        把一次识别产生的历史事件放入缓冲。
+        :param entries: [(query_content, result_category), ...]，每项计 1 积分
+        :return: 是否已放入缓冲；缓冲关闭、积压过多（例如数据库持续不可用）时返回 False，由调用方同步写入
+        """
+        if not self.enabled:
+            return False
+        self._worker.get()
+        with self._lock:
+            if self._closed or len(self._events) + len(entries) > self.max_pending:
+                return False
+            self._events.extend(
+                (user_id, query_type, query_content, result_category, created_at)
+                for query_content, result_category in entries
+            )
+            if len(self._events) >= self.flush_size:
+                self._wakeup.notify()
+        return True
+
+    def pending(self):
+        """当前尚未写入数据库的事件数"""
+        return len(self._events) if self._worker.peek() is not None else 0
+
+    def flush(self):
+        """
+        在当前线程中把缓冲的全部事件写入数据库。
+        :return: 写入的事件数；写入失败时事件放回缓冲，返回 0
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+
+            if self._consecutive_failures >= self.max_attempts:
+                written, remaining = self._write_isolating(events)
+            else:
+                try:
+                    self._write(events)
+                    written, remaining = len(events), []
+                except Exception as e:
+                    print(f"写入识别历史失败，{len(events)} 条记录将在下次重试: {e}")
+                    written, remaining = 0, events
+
+            if remaining:
+                with self._lock:
+                    self._events[:0] = remaining
+                self._consecutive_failures += 1
+                self.failed_flushes += 1
+            else:
+                self._consecutive_failures = 0
+            self.flushed += written
+            return written
+
+    def _write(self, events):
+        from .services import write_history_batch
+
+        # 独立的应用上下文即独立的数据库会话，不会提交请求线程中未完成的修改
+        with self._app.app_context():
+            write_history_batch(events)
+
+    def _write_isolating(self, events):
+        """
+        把事件逐层二分后分别写入：单条仍写入失败的事件丢弃并记录日志；
+        遇到数据库不可用时停止拆分，尚未写入的事件按原顺序返回
+        :return: (写入的事件数, 尚未写入的事件)
+        """
+        written = 0
+        chunks = deque([events])
+        while chunks:
+            chunk = chunks.popleft()
+            try:
+                self._write(chunk)
+                written += len(chunk)
+            except OperationalError as e:
+                remaining = [event for part in (chunk, *chunks) for event in part]
+                print(f"写入识别历史失败（数据库不可用），{len(remaining)} 条记录将在下次重试: {e}")
+                return written, remaining
+            except Exception as e:
+                if len(chunk) == 1:
+                    self.dropped += 1
+                    print(f"识别历史无法写入，已丢弃: {chunk[0]} ({e})")
+                else:
+                    middle = len(chunk) // 2
+                    chunks.extendleft((chunk[middle:], chunk[:middle]))
+        return written, []
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                # 上次写入失败时，即使缓冲已满也等满一个间隔再重试
+                while not self._closed and (failed or len(self._events) < self.flush_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if self._closed:
+                    return
+            failed = self.flush() == 0 and self.pending() > 0
+
+    def close(self, timeout=30.0):
+        """
+        停止接收新事件，并写完缓冲中剩余的事件。进程退出前调用，可重复调用。
+        写入持续失败时最多重试到 timeout 秒。
+        """
+        worker = self._worker.peek()
+        if worker is None:
+            return
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        worker.join(timeout)
+
+        deadline = time.monotonic() + timeout
+        while self._events and time.monotonic() < deadline:
+            if not self.flush():
+                time.sleep(min(1.0, self.flush_interval))
+        if self._events:
+            print(f"进程退出时仍有 {len(self._events)} 条识别历史未能写入数据库")
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'pending': self.pending(),
+            'flushed': self.flushed,
+            'failed_flushes': self.failed_flushes,
+            'dropped': self.dropped,
+        }
+
+
+# 全局写后缓冲实例，由 create_app 按配置启用；进程退出前写完缓冲中的事件
+history_buffer = HistoryBuffer()
+atexit.register(history_buffer.close)
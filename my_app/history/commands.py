@@ -0,0 +1,112 @@
+# my_app/history/commands.py
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from .rollups import compact_rollups, backfill_rollups, month_start, next_month
+from .services import rebuild_category_stats, archive_history_range
+from ..models import db, QueryHistory, QueryHistoryArchive
+
+
+def _parse_date(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise click.BadParameter('日期格式应为 YYYY-MM-DD')
+
+
+@click.command('rebuild-category-stats')
+@click.option('--start', callback=_parse_date, help='起始日期（含），YYYY-MM-DD，默认不限')
+@click.option('--end', callback=_parse_date, help='结束日期（含），YYYY-MM-DD，默认不限')
+@with_appcontext
+def rebuild_category_stats_command(start, end):
+    """
+    由识别历史重新计算分类统计预聚合表。
+    用于初次上线，或绕过应用直接写入、删除识别历史之后；建议在访问量较低时执行，
+    执行期间新写入的识别记录可能被重复计数或遗漏。
+    """
+    rows = rebuild_category_stats(start, end)
+    click.echo(f"✅ 分类统计已重建：{rows} 行")
+
+
+@click.command('archive-history')
+@click.option('--older-than-days', type=int, help='归档早于该天数的记录，默认取配置 HISTORY_ARCHIVE_AFTER_DAYS')
+@click.option('--include-deleted/--keep-deleted', default=True, show_default=True,
+              help='是否同时归档已被用户删除的记录（不论时间）')
+@click.option('--batch-size', default=1000, show_default=True, help='每批处理的记录ID范围，每批单独提交')
+@click.option('--sleep', default=0.0, show_default=True, help='每批之间的暂停秒数，用于降低对线上库与主从复制的压力')
+@with_appcontext
+def archive_history_command(older_than_days, include_deleted, batch_size, sleep):
+    """
+    把旧的或已删除的识别历史迁入归档表 queryhistory_archive，并从在线表中分批删除。
+    按记录ID分段处理，每段一个小事务，可随时中断后重新执行。分类统计不受影响。
+    """
+    if older_than_days is None:
+        older_than_days = current_app.config['HISTORY_ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+
+    min_id, max_id = db.session.query(func.min(QueryHistory.id), func.max(QueryHistory.id)).one()
+    db.session.rollback()
+    if min_id is None:
+        click.echo("识别历史为空，无需归档")
+        return
+
+    archived = 0
+    started = time.perf_counter()
+    for batch_no, start_id in enumerate(range(min_id, max_id + 1, batch_size), 1):
+        archived += archive_history_range(start_id, start_id + batch_size, cutoff, include_deleted)
+        if batch_no % 100 == 0:
+            click.echo(f"已处理至ID {start_id + batch_size - 1} / {max_id}，归档 {archived} 条")
+        if sleep:
+            time.sleep(sleep)
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"✅ 归档完成：{cutoff:%Y-%m-%d %H:%M} 之前"
+               f"{'及已删除' if include_deleted else ''}的记录共 {archived} 条，耗时 {elapsed:.1f} 秒")
+
+
+@click.command('compact-rollups')
+@with_appcontext
+def compact_rollups_command():
+    """
+    汇总已经结束的日期与月份的趋势统计（日/月活跃用户数、月度分类统计），并清理过期的小时统计与活跃明细。
+    建议每小时执行一次；可重复执行，未执行期间的趋势查询仍然准确，只是需要实时汇总的范围更大。
+    """
+    result = compact_rollups()
+    click.echo(f"✅ 汇总完成：{result['days']} 天，{result['months']} 个月；"
+               f"清理小时统计 {result['pruned_hours']} 行，活跃明细 {result['pruned_activity']} 行")
+
+
+@click.command('backfill-rollups')
+@click.option('--start', callback=_parse_date, help='起始日期，YYYY-MM-DD，按所在月份的1日处理，默认为最早的识别记录')
+@click.option('--end', callback=_parse_date, help='结束日期，YYYY-MM-DD，按所在月份的最后一天处理，默认为今天')
+@with_appcontext
+def backfill_rollups_command(start, end):
+    """
+    由识别历史（含归档）重建指定月份范围内的全部趋势统计：日分类统计、小时统计（保留期限内）、
+    活跃用户明细，以及日/月汇总。用于初次上线或绕过应用直接修改识别历史之后，建议在访问量较低时执行。
+    """
+    if start is None:
+        earliest = [db.session.query(func.min(model.created_at)).scalar() for model in (QueryHistory, QueryHistoryArchive)]
+        earliest = [value for value in earliest if value is not None]
+        if not earliest:
+            click.echo("识别历史为空，无需重建")
+            return
+        start = min(earliest).date()
+    end = end or date.today()
+    if start > end:
+        raise click.BadParameter('起始日期不能晚于结束日期', param_hint='--start')
+
+    # 月度汇总需要整月的数据，因此按整月重建
+    start, end = month_start(start), next_month(month_start(end)) - timedelta(days=1)
+    started = time.perf_counter()
+    daily = rebuild_category_stats(start, end)
+    hourly, activity = backfill_rollups(start, end)
+    click.echo(f"✅ {start} 至 {end} 的趋势统计已重建：日统计 {daily} 行，小时统计 {hourly} 行，"
+               f"活跃明细 {activity} 行，耗时 {time.perf_counter() - started:.1f} 秒")
@@ -0,0 +1,297 @@
+# my_app/history/rollups.py
+"""
+识别趋势的多级汇总 (rollup)。
+
+  - 写入时：在识别历史的同一事务中累加小时、日分类统计，并记录当天进行过识别的用户；
+  - compact-rollups 命令：为已结束的日期写入日活跃用户数，为已结束的月份由日统计汇总月度分类统计
+    与月活跃用户数，并清理超过保留期限的小时统计与活跃明细；
+  - 查询：已汇总的部分直接读汇总表，尚未汇总的最近一段由下一级数据实时汇总，均不扫描 queryhistory。
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import distinct, func, select
+
+from ..models import (
+    db, QueryHistory, QueryHistoryArchive, CategoryHourlyStat, CategoryDailyStat, CategoryMonthlyStat,
+    UserDailyActivity, ActiveUserStat
+)
+from ..sql_utils import upsert_statement, insert_ignore_statement, truncate_to_hour, chunked
+
+GRANULARITIES = ('hour', 'day', 'month')
+# 整点过后的这段时间内仍可能有该时段的记录写入（例如写后缓冲），之后才视为该日、该月已经结束
+SETTLE_DELAY = timedelta(hours=1)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def increment_rollups(events):
+    """
+    在当前事务中累加小时、日分类统计并记录活跃用户，与识别历史一同提交
+    :param events: [(user_id, query_type, result_category, created_at), ...]，每项计一次
+    """
+    hourly, daily, active = Counter(), Counter(), set()
+    for user_id, query_type, result_category, created_at in events:
+        hourly[created_at.replace(minute=0, second=0, microsecond=0), query_type, result_category] += 1
+        daily[created_at.date(), query_type, result_category] += 1
+        active.add((created_at.date(), user_id))
+
+    # 按主键顺序写入，使并发事务以相同顺序加锁，避免死锁
+    for model, key, counts in ((CategoryHourlyStat, 'hour', hourly), (CategoryDailyStat, 'day', daily)):
+        stmt = upsert_statement(model, [key, 'query_type', 'result_category'], increment_columns=['count'])
+        db.session.execute(stmt, [
+            {key: bucket, 'query_type': query_type, 'result_category': result_category, 'count': count}
+            for (bucket, query_type, result_category), count in sorted(counts.items())
+        ])
+    db.session.execute(
+        insert_ignore_statement(UserDailyActivity, ['day', 'user_id']),
+        [{'day': day, 'user_id': user_id} for day, user_id in sorted(active)]
+    )
+
+
+# --- 汇总 ---
+
+def _watermark(granularity):
+    """已写入活跃用户汇总的最后一个日期或月份；此前的日期（月份）均已汇总"""
+    return db.session.query(func.max(ActiveUserStat.bucket)).filter_by(granularity=granularity).scalar()
+
+
+def _rollup_days(first, stop):
+    """写入 [first, stop) 内每一天的活跃用户数（没有活跃用户的日期记为 0）"""
+    if first >= stop:
+        return 0
+    users = dict(
+        db.session.query(UserDailyActivity.day, func.count(UserDailyActivity.user_id))
+        .filter(UserDailyActivity.day >= first, UserDailyActivity.day < stop)
+        .group_by(UserDailyActivity.day)
+    )
+    ActiveUserStat.query.filter(
+        ActiveUserStat.granularity == 'day', ActiveUserStat.bucket >= first, ActiveUserStat.bucket < stop
+    ).delete(synchronize_session=False)
+
+    days = (first + timedelta(days=i) for i in range((stop - first).days))
+    for chunk in chunked(days, 1000):
+        db.session.execute(ActiveUserStat.__table__.insert(), [
+            {'granularity': 'day', 'bucket': day, 'users': users.get(day, 0)} for day in chunk
+        ])
+    return (stop - first).days
+
+
+def _rollup_months(first, stop):
+    """由日统计与活跃明细重新汇总 [first, stop) 内各月份（均为月初）的分类统计与月活跃用户数"""
+    if first >= stop:
+        return 0
+    counts = Counter()
+    daily = db.session.query(
+        CategoryDailyStat.day, CategoryDailyStat.query_type, CategoryDailyStat.result_category, CategoryDailyStat.count
+    ).filter(CategoryDailyStat.day >= first, CategoryDailyStat.day < stop)
+    for day, query_type, result_category, count in daily:
+        counts[month_start(day), query_type, result_category] += count
+
+    CategoryMonthlyStat.query.filter(CategoryMonthlyStat.month >= first, CategoryMonthlyStat.month < stop) \
+        .delete(synchronize_session=False)
+    if counts:
+        db.session.execute(CategoryMonthlyStat.__table__.insert(), [
+            {'month': month, 'query_type': query_type, 'result_category': result_category, 'count': count}
+            for (month, query_type, result_category), count in sorted(counts.items())
+        ])
+
+    ActiveUserStat.query.filter(
+        ActiveUserStat.granularity == 'month', ActiveUserStat.bucket >= first, ActiveUserStat.bucket < stop
+    ).delete(synchronize_session=False)
+    months = 0
+    month = first
+    while month < stop:
+        db.session.add(ActiveUserStat(granularity='month', bucket=month, users=_monthly_active_users(month)))
+        month = next_month(month)
+        months += 1
+    return months
+
+
+def _monthly_active_users(month):
+    return db.session.query(func.count(distinct(UserDailyActivity.user_id))).filter(
+        UserDailyActivity.day >= month, UserDailyActivity.day < next_month(month)
+    ).scalar()
+
+
+def _earliest_day():
+    days = [
+        db.session.query(func.min(UserDailyActivity.day)).scalar(),
+        db.session.query(func.min(CategoryDailyStat.day)).scalar(),
+    ]
+    days = [day for day in days if day is not None]
+    return min(days) if days else None
+
+
+def compact_rollups(now=None):
+    """
+    汇总上次执行以来已经结束的日期与月份，并清理过期的小时统计与活跃明细，可重复执行。
+    :return: {'days': 汇总的天数, 'months': 汇总的月数, 'pruned_hours': 删除的小时统计行数, 'pruned_activity': 删除的活跃明细行数}
+    """
+    settled = ((now or datetime.now()) - SETTLE_DELAY).date()
+    earliest = _earliest_day()
+    result = {'days': 0, 'months': 0, 'pruned_hours': 0, 'pruned_activity': 0}
+
+    day_mark = _watermark('day')
+    first_day = day_mark + timedelta(days=1) if day_mark else earliest
+    if first_day:
+        result['days'] = _rollup_days(first_day, settled)
+
+    month_mark = _watermark('month')
+    first_month = next_month(month_mark) if month_mark else (month_start(earliest) if earliest else None)
+    if first_month:
+        result['months'] = _rollup_months(first_month, month_start(settled))
+
+    hourly_cutoff = datetime.combine(settled - timedelta(days=current_app.config['STATS_HOURLY_RETENTION_DAYS']), time.min)
+    result['pruned_hours'] = CategoryHourlyStat.query.filter(CategoryHourlyStat.hour < hourly_cutoff) \
+        .delete(synchronize_session=False)
+
+    # 活跃明细只清理已经汇总为月活跃用户数的月份
+    month_mark = _watermark('month')
+    if month_mark:
+        activity_cutoff = min(
+            settled - timedelta(days=current_app.config['STATS_ACTIVITY_RETENTION_DAYS']), next_month(month_mark)
+        )
+        result['pruned_activity'] = UserDailyActivity.query.filter(UserDailyActivity.day < activity_cutoff) \
+            .delete(synchronize_session=False)
+
+    db.session.commit()
+    return result
+
+
+def backfill_rollups(start, end, now=None):
+    """
+    由识别历史（含归档）重建 [start, end] 内的小时统计与活跃明细，并重新汇总其中已经结束的日期与月份。
+    日统计由 rebuild_category_stats 重建，应先于本函数执行。start、end 应为整月的首尾，否则月度汇总不完整。
+    :return: (写入的小时统计行数, 写入活跃明细的记录数)
+    """
+    now = now or datetime.now()
+    settled = (now - SETTLE_DELAY).date()
+    lo = datetime.combine(start, time.min)
+    hi = datetime.combine(end + timedelta(days=1), time.min)
+
+    # 小时统计只保留最近一段时间，更早的部分不再重建
+    hour_lo = max(lo, datetime.combine(settled - timedelta(days=current_app.config['STATS_HOURLY_RETENTION_DAYS']), time.min))
+    CategoryHourlyStat.query.filter(CategoryHourlyStat.hour >= hour_lo, CategoryHourlyStat.hour < hi) \
+        .delete(synchronize_session=False)
+    counts = Counter()
+    for model in (QueryHistory, QueryHistoryArchive):
+        hour = truncate_to_hour(model.created_at)
+        query = db.session.query(hour, model.query_type, model.result_category, func.count(model.id)) \
+            .filter(model.created_at >= hour_lo, model.created_at < hi) \
+            .group_by(hour, model.query_type, model.result_category)
+        for bucket, query_type, result_category, count in query:
+            bucket = datetime.fromisoformat(bucket) if isinstance(bucket, str) else bucket
+            counts[bucket, query_type, result_category] += count
+    for chunk in chunked(sorted(counts.items()), 5000):
+        db.session.execute(CategoryHourlyStat.__table__.insert(), [
+            {'hour': bucket, 'query_type': query_type, 'result_category': result_category, 'count': count}
+            for (bucket, query_type, result_category), count in chunk
+        ])
+
+    # 活跃明细：在数据库内按 (日期, 用户) 去重后直接写入
+    UserDailyActivity.query.filter(UserDailyActivity.day >= start, UserDailyActivity.day <= end) \
+        .delete(synchronize_session=False)
+    activity = 0
+    for model in (QueryHistory, QueryHistoryArchive):
+        activity += db.session.execute(
+            insert_ignore_statement(UserDailyActivity, ['day', 'user_id']).from_select(
+                ['day', 'user_id'],
+                select(func.date(model.created_at), model.user_id).distinct()
+                .where(model.created_at >= lo, model.created_at < hi)
+            )
+        ).rowcount
+    db.session.commit()
+
+    _rollup_days(start, min(end + timedelta(days=1), settled))
+    _rollup_months(month_start(start), min(next_month(month_start(end)), month_start(settled)))
+    db.session.commit()
+    return len(counts), activity
+
+
+# --- 查询 ---
+
+def _category_query(model, bucket_column, lo, hi, query_type, result_category):
+    query = db.session.query(bucket_column, model.query_type, model.result_category, model.count) \
+        .filter(bucket_column >= lo, bucket_column < hi)
+    if query_type:
+        query = query.filter(model.query_type == query_type)
+    if result_category:
+        query = query.filter(model.result_category == result_category)
+    return query
+
+
+def get_trend_series(granularity, start, end, query_type=None, result_category=None):
+    """
+    各分类的识别次数趋势
+    :param granularity: 'hour'、'day' 或 'month'
+    :param start: 起始日期（含）
+    :param end: 结束日期（含）
+    :return: [(时段起点, query_type, result_category, count), ...]，按时段排序；没有识别的时段不返回
+    """
+    if granularity == 'hour':
+        rows = _category_query(
+            CategoryHourlyStat, CategoryHourlyStat.hour,
+            datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min),
+            query_type, result_category
+        ).all()
+    elif granularity == 'day':
+        rows = _category_query(
+            CategoryDailyStat, CategoryDailyStat.day, start, end + timedelta(days=1), query_type, result_category
+        ).all()
+    else:
+        first, stop = month_start(start), next_month(month_start(end))
+        # 已汇总的月份读月度统计，之后的月份由日统计实时汇总
+        month_mark = _watermark('month')
+        compacted_stop = min(stop, next_month(month_mark)) if month_mark else first
+        rows = _category_query(
+            CategoryMonthlyStat, CategoryMonthlyStat.month, first, compacted_stop, query_type, result_category
+        ).all()
+        counts = Counter()
+        for day, q_type, category, count in _category_query(
+                CategoryDailyStat, CategoryDailyStat.day, max(first, compacted_stop), stop, query_type, result_category):
+            counts[month_start(day), q_type, category] += count
+        rows += [(*key, count) for key, count in counts.items()]
+
+    return sorted(tuple(row) for row in rows)
+
+
+def get_active_users(granularity, start, end):
+    """
+    活跃用户数（当天/当月至少进行过一次识别的用户数）趋势
+    :param granularity: 'day' 或 'month'
+    :return: [(日期或月初, 活跃用户数), ...]，按时段排序；没有活跃用户的时段不返回
+    """
+    if granularity == 'day':
+        first, stop = start, end + timedelta(days=1)
+    else:
+        first, stop = month_start(start), next_month(month_start(end))
+
+    # 已汇总的部分读汇总表，之后的部分由活跃明细实时统计
+    mark = _watermark(granularity)
+    users = dict(
+        db.session.query(ActiveUserStat.bucket, ActiveUserStat.users).filter(
+            ActiveUserStat.granularity == granularity, ActiveUserStat.bucket >= first, ActiveUserStat.bucket < stop
+        )
+    )
+    if granularity == 'day':
+        live_first = max(first, mark + timedelta(days=1)) if mark else first
+        users.update(
+            db.session.query(UserDailyActivity.day, func.count(UserDailyActivity.user_id))
+            .filter(UserDailyActivity.day >= live_first, UserDailyActivity.day < stop)
+            .group_by(UserDailyActivity.day)
+        )
+    else:
+        month = max(first, next_month(mark)) if mark else first
+        while month < stop:
+            users[month] = _monthly_active_users(month)
+            month = next_month(month)
+
+    return sorted((bucket, count) for bucket, count in users.items() if count)
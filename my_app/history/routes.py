@@ -1,26 +1,60 @@
 # my_app/history/routes.py
-from flask import Blueprint, jsonify, g
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, g, request, stream_with_context
 from ..decorators import login_required, admin_required
-from .services import get_history_by_user_id_service, delete_history_service, get_category_statistics_service
+from .rollups import GRANULARITIES, get_trend_series, get_active_users
+from .services import (
+    get_history_by_user_id_service, delete_history_service, get_category_statistics_service,
+    export_history_service, EXPORT_COLUMNS
+)
 
 history_bp = Blueprint('history', __name__, url_prefix='/api/history')
 
 
+def _history_page(user_id, is_admin):
+    """
+    解析分页与筛选参数 (limit、cursor、query_type、result_category)，返回一页历史记录；
+    管理员另可通过 include_archived=true 同时查询归档的记录
+    """
+    limit = request.args.get('limit', 20, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({'message': '参数 "limit" 的取值范围为 1-100'}), 400
+
+    try:
+        histories, next_cursor, total = get_history_by_user_id_service(
+            user_id,
+            is_admin=is_admin,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            query_type=request.args.get('query_type'),
+            result_category=request.args.get('result_category'),
+            include_archived=request.args.get('include_archived', 'false').lower() == 'true'
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({
+        'items': [h.to_dict() for h in histories],
+        'next_cursor': next_cursor,
+        'total': total
+    }), 200
+
+
 @history_bp.route('/my', methods=['GET'])
 @login_required
 def get_my_history():
-    """(用户)查询自己的识别历史记录"""
-    user_id = g.user.id
-    histories = get_history_by_user_id_service(user_id, is_admin=False)
-    return jsonify([h.to_dict() for h in histories]), 200
+    """(用户)分页查询自己的识别历史记录"""
+    return _history_page(g.user.id, is_admin=False)
 
 
 @history_bp.route('/user/<int:user_id>', methods=['GET'])
 @admin_required
 def get_user_history(user_id):
-    """(管理员)查看指定用户的识别历史记录"""
-    histories = get_history_by_user_id_service(user_id, is_admin=True)
-    return jsonify([h.to_dict() for h in histories]), 200
+    """(管理员)分页查看指定用户的识别历史记录"""
+    return _history_page(user_id, is_admin=True)
 
 
 @history_bp.route('/delete/<int:history_id>', methods=['DELETE'])
@@ -35,10 +69,166 @@ def delete_history(history_id):
     return jsonify({'message': message}), 200
 
 
+def _date_range():
+    """
+    解析 start、end 参数 (YYYY-MM-DD)
+    :raises ValueError: 日期格式不正确，或起始日期晚于结束日期
+    """
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        raise ValueError('日期格式应为 YYYY-MM-DD')
+    if start and end and start > end:
+        raise ValueError('起始日期不能晚于结束日期')
+    return start, end
+
+
 @history_bp.route('/stats', methods=['GET'])
 @admin_required
 def get_category_stats():
-    """(管理员) 获取各类别识别数量的统计信息"""
-    stats = get_category_statistics_service()
+    """(管理员) 获取各类别识别数量的统计信息，可按日期范围 (start、end，YYYY-MM-DD) 与查询方式筛选"""
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    stats = get_category_statistics_service(start, end, request.args.get('query_type'))
     stats_dict = [{'category': category, 'count': count} for category, count in stats]
-    return jsonify(stats_dict), 200
\ No newline at end of file
+    return jsonify(stats_dict), 200
+
+
+# 未指定 start 时默认查询的天数
+TREND_DEFAULT_DAYS = {'hour': 2, 'day': 30, 'month': 365}
+TREND_BUCKET_FORMATS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'month': '%Y-%m'}
+
+
+@history_bp.route('/trends', methods=['GET'])
+@admin_required
+def get_trends():
+    """
+    (管理员) 按小时、日或月获取各类别的识别次数趋势与活跃用户数，
+    可按日期范围 (start、end)、查询方式与识别结果分类筛选
+    """
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'message': '参数 "granularity" 只能为 hour、day 或 month'}), 400
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    end = end or date.today()
+    start = start or end - timedelta(days=TREND_DEFAULT_DAYS[granularity] - 1)
+    if start > end:
+        return jsonify({'message': '起始日期不能晚于结束日期'}), 400
+    if granularity == 'hour':
+        # 小时统计只保留最近 STATS_HOURLY_RETENTION_DAYS 天，更早的部分已被清理，查询会得到不完整的结果
+        retention_days = current_app.config['STATS_HOURLY_RETENTION_DAYS']
+        earliest = date.today() - timedelta(days=retention_days)
+        if start < earliest:
+            return jsonify({
+                'message': f'小时统计只保留最近 {retention_days} 天，按小时查询的起始日期不能早于 {earliest.isoformat()}'
+            }), 400
+
+    bucket_format = TREND_BUCKET_FORMATS[granularity]
+    series = get_trend_series(
+        granularity, start, end,
+        query_type=request.args.get('query_type'),
+        result_category=request.args.get('result_category')
+    )
+    # 活跃用户只按日、按月统计
+    active_users = None if granularity == 'hour' else [
+        {'bucket': bucket.strftime(bucket_format), 'users': users}
+        for bucket, users in get_active_users(granularity, start, end)
+    ]
+    return jsonify({
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': [
+            {'bucket': bucket.strftime(bucket_format), 'query_type': query_type, 'category': category, 'count': count}
+            for bucket, query_type, category, count in series
+        ],
+        'active_users': active_users
+    }), 200
+
+
+EXPORT_BATCH_ROWS = 1000
+
+
+def _format_row(row):
+    values = dict(zip(EXPORT_COLUMNS + ('archived',), row))
+    values['created_at'] = values['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return values
+
+
+def _ndjson_chunks(rows):
+    """每行一个 JSON 对象，每 EXPORT_BATCH_ROWS 行输出一次，减少响应分块的数量"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_format_row(row), ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _csv_chunks(rows):
+    """带表头的 CSV；以 BOM 开头，Excel 可直接正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_COLUMNS + ('archived',))
+    for count, row in enumerate(rows, 1):
+        values = _format_row(row)
+        values['archived'] = int(values['archived'])
+        writer.writerow(values.values())
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@history_bp.route('/export', methods=['GET'])
+@admin_required
+def export_history():
+    """
+    (管理员) 流式导出识别历史，format 为 ndjson（默认）或 csv。
+    可按用户 (user_id)、日期范围 (start、end)、查询方式与识别结果分类筛选，include_archived=true 时包含归档的记录
+    """
+    file_format = request.args.get('format', 'ndjson').lower()
+    if file_format not in ('ndjson', 'csv'):
+        return jsonify({'message': '参数 "format" 只能为 ndjson 或 csv'}), 400
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    user_id = request.args.get('user_id', type=int)
+    if user_id is None and request.args.get('user_id'):
+        return jsonify({'message': '参数 "user_id" 必须为整数'}), 400
+
+    rows = export_history_service(
+        user_id=user_id,
+        start=start,
+        end=end,
+        query_type=request.args.get('query_type'),
+        result_category=request.args.get('result_category'),
+        include_archived=request.args.get('include_archived', 'false').lower() == 'true'
+    )
+
+    if file_format == 'csv':
+        body, content_type = _csv_chunks(rows), 'text/csv; charset=utf-8'
+    else:
+        body, content_type = _ndjson_chunks(rows), 'application/x-ndjson; charset=utf-8'
+    filename = f"history_{user_id if user_id is not None else 'all'}_{datetime.now():%Y%m%d%H%M%S}.{file_format}"
+
+    # stream_with_context 使生成器在响应输出期间仍能使用请求上下文中的数据库会话
+    return Response(
+        stream_with_context(body),
+        content_type=content_type,
+        # 关闭反向代理（如 Nginx）的响应缓冲，边查询边发送
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
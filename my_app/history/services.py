@@ -1,25 +1,105 @@
 # my_app/history/services.py
-from sqlalchemy import func
-from ..models import db, QueryHistory, User
+from collections import Counter
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import bindparam, delete, func, insert, literal, or_, select, update
+from ..models import db, QueryHistory, QueryHistoryArchive, User, CategoryDailyStat
+from ..pagination import decode_cursor, keyset_after, paginate_keyset, paginate_keyset_merged
+from .rollups import increment_rollups
 
 
-def get_history_by_user_id_service(user_id, is_admin=False):
+def get_history_by_user_id_service(user_id, is_admin=False, limit=20, cursor=None,
+                                   query_type=None, result_category=None, include_archived=False):
     """
-    根据用户ID获取历史记录的业务逻辑
+    根据用户ID按时间倒序分页获取历史记录的业务逻辑
     :param user_id: 用户ID
     :param is_admin: 是否为管理员查询。管理员可查看所有状态的记录
-    :return: 历史记录列表
+    :param cursor: 上一页返回的游标，为空时查询第一页
+    :param query_type: 只返回指定查询方式 ('text' 或 'image') 的记录
+    :param result_category: 只返回指定识别结果分类的记录
+    :param include_archived: 是否同时查询归档表（仅管理员），两张表的记录按时间合并分页
+    :return: (历史记录列表, 下一页游标, 符合条件的记录总数)；总数只在第一页计算，其余页为 None
+    :raises ValueError: 游标不合法
     """
     # 验证用户是否存在
     user = User.query.get_or_404(user_id)
 
-    query = QueryHistory.query.filter_by(user_id=user_id)
+    models = (QueryHistory, QueryHistoryArchive) if is_admin and include_archived else (QueryHistory,)
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
 
-    if not is_admin:
-        # 普通用户只能查询 status 为 0 的正常记录
-        query = query.filter_by(status=0)
+    queries = []
+    total = None if cursor else 0
+    for model in models:
+        query = model.query.filter_by(user_id=user_id)
 
-    return query.order_by(QueryHistory.created_at.desc()).all()
+        if not is_admin:
+            # 普通用户只能查询 status 为 0 的正常记录
+            query = query.filter_by(status=0)
+        if query_type:
+            query = query.filter_by(query_type=query_type)
+        if result_category:
+            query = query.filter_by(result_category=result_category)
+
+        if after is None:
+            # 只统计行数，不读取记录内容，也不排序
+            total += query.with_entities(func.count(model.id)).scalar()
+        else:
+            query = query.filter(keyset_after((model.created_at, model.id), after))
+
+        queries.append(query.order_by(model.created_at.desc(), model.id.desc()))
+
+    sort_key = lambda h: (h.created_at, h.id)
+    if len(queries) == 1:
+        histories, next_cursor = paginate_keyset(queries[0], limit, sort_key)
+    else:
+        histories, next_cursor = paginate_keyset_merged(queries, limit, sort_key)
+    return histories, next_cursor, total
+
+
+EXPORT_COLUMNS = ('id', 'user_id', 'query_type', 'query_content', 'result_category', 'created_at', 'status')
+
+
+def export_history_service(user_id=None, start=None, end=None, query_type=None, result_category=None,
+                           include_archived=False, batch_size=1000):
+    """
+    导出识别历史的业务逻辑，返回逐行产出记录的生成器，供流式响应使用。
+    :param user_id: 只导出指定用户的记录，为空时导出全部用户
+    :param start: 起始日期（含），为空表示不限
+    :param end: 结束日期（含），为空表示不限
+    :param include_archived: 是否同时导出归档的记录（先输出归档表，再输出在线表）
+    :return: 生成器，产出 EXPORT_COLUMNS 各列的值加上是否已归档
+    """
+    # 在开始输出之前校验用户，以便返回 404
+    if user_id is not None:
+        User.query.get_or_404(user_id)
+
+    models = (QueryHistoryArchive, QueryHistory) if include_archived else (QueryHistory,)
+    return _iter_history_rows(models, user_id, start, end, query_type, result_category, batch_size)
+
+
+def _iter_history_rows(models, user_id, start, end, query_type, result_category, batch_size):
+    for model in models:
+        stmt = select(*(getattr(model, column) for column in EXPORT_COLUMNS))
+        if user_id is not None:
+            # 沿 (user_id, created_at) 索引按时间顺序读取
+            stmt = stmt.where(model.user_id == user_id).order_by(model.created_at, model.id)
+        elif start or end:
+            # 按日期范围导出全部用户时沿 (created_at, id) 索引做范围扫描，不读取范围之外的记录
+            stmt = stmt.order_by(model.created_at, model.id)
+        else:
+            stmt = stmt.order_by(model.id)
+        if start:
+            stmt = stmt.where(model.created_at >= datetime.combine(start, time.min))
+        if end:
+            stmt = stmt.where(model.created_at < datetime.combine(end + timedelta(days=1), time.min))
+        if query_type:
+            stmt = stmt.where(model.query_type == query_type)
+        if result_category:
+            stmt = stmt.where(model.result_category == result_category)
+
+        # 只读取列值而不构造 ORM 对象；yield_per 使用服务端游标分批读取，不会一次性载入整个结果集
+        archived = model is QueryHistoryArchive
+        for row in db.session.execute(stmt.execution_options(yield_per=batch_size)):
+            yield (*row, archived)
 
 
 def delete_history_service(history_id, current_user_id):
@@ -42,12 +122,128 @@ def delete_history_service(history_id, current_user_id):
     return True, "历史记录已删除"
 
 
-def get_category_statistics_service():
+def write_history_batch(events):
+    """
+    批量写入识别历史，并在同一个事务中按用户合并积分增量、累加趋势统计。
+    供写后缓冲定期调用，需要在应用上下文中执行。
+    :param events: [(user_id, query_type, query_content, result_category, created_at), ...]
+    """
+    db.session.execute(insert(QueryHistory), [
+        {
+            'user_id': user_id,
+            'query_type': query_type,
+            'query_content': query_content,
+            'result_category': result_category,
+            'created_at': created_at,
+        }
+        for user_id, query_type, query_content, result_category, created_at in events
+    ])
+
+    # 每个用户只更新一次；以 points = points + 增量 的形式写入，不覆盖其他请求（如兑换）同时做出的修改。
+    # 按用户ID顺序加锁，避免与其他批次死锁
+    deltas = Counter(event[0] for event in events)
+    db.session.execute(
+        update(User.__table__)
+        .where(User.__table__.c.id == bindparam('user_id'))
+        .values(points=User.__table__.c.points + bindparam('delta')),
+        [{'user_id': user_id, 'delta': delta} for user_id, delta in sorted(deltas.items())]
+    )
+
+    increment_rollups([
+        (user_id, query_type, result_category, created_at)
+        for user_id, query_type, _, result_category, created_at in events
+    ])
+
+    db.session.commit()
+
+
+def get_category_statistics_service(start=None, end=None, query_type=None):
     """
-    统计查询历史中每个类别的数量
+    从预聚合表统计各个类别的识别数量，耗时只与日期范围有关，与识别历史的总量无关
+    :param start: 起始日期（含），为空表示不限
+    :param end: 结束日期（含），为空表示不限
+    :param query_type: 只统计指定查询方式 ('text' 或 'image')
     :return: 一个包含类别和数量的元组列表
     """
-    return db.session.query(
-        QueryHistory.result_category,
-        func.count(QueryHistory.result_category).label('count')
-    ).group_by(QueryHistory.result_category).all()
\ No newline at end of file
+    query = db.session.query(
+        CategoryDailyStat.result_category,
+        func.sum(CategoryDailyStat.count).label('count')
+    )
+    if start:
+        query = query.filter(CategoryDailyStat.day >= start)
+    if end:
+        query = query.filter(CategoryDailyStat.day <= end)
+    if query_type:
+        query = query.filter(CategoryDailyStat.query_type == query_type)
+    return [(category, int(count)) for category, count in
+            query.group_by(CategoryDailyStat.result_category).order_by(CategoryDailyStat.result_category)]
+
+
+def rebuild_category_stats(start=None, end=None):
+    """
+    由识别历史重新计算指定日期范围内的预聚合统计（用于初次上线或绕过应用写入历史之后）
+    :return: 写入的统计行数
+    """
+    stats_delete = CategoryDailyStat.query
+    if start:
+        stats_delete = stats_delete.filter(CategoryDailyStat.day >= start)
+    if end:
+        stats_delete = stats_delete.filter(CategoryDailyStat.day <= end)
+
+    # 已归档的记录同样计入统计
+    counts = Counter()
+    for model in (QueryHistory, QueryHistoryArchive):
+        day = func.date(model.created_at)
+        query = db.session.query(day, model.query_type, model.result_category, func.count(model.id))
+        if start:
+            query = query.filter(model.created_at >= datetime.combine(start, time.min))
+        if end:
+            query = query.filter(model.created_at < datetime.combine(end + timedelta(days=1), time.min))
+        for bucket, query_type, result_category, count in query.group_by(day, model.query_type, model.result_category):
+            # SQLite 的 date() 返回字符串
+            bucket = date.fromisoformat(bucket) if isinstance(bucket, str) else bucket
+            counts[bucket, query_type, result_category] += count
+
+    rows = [
+        {'day': bucket, 'query_type': query_type, 'result_category': result_category, 'count': count}
+        for (bucket, query_type, result_category), count in counts.items()
+    ]
+
+    stats_delete.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(CategoryDailyStat.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def archive_history_range(start_id, end_id, cutoff, include_deleted=True):
+    """
+    把ID在 [start_id, end_id) 范围内、早于 cutoff（include_deleted 时还包括已删除）的识别历史
+    迁入归档表，并从在线表中删除。迁入与删除在同一个事务中提交，中途失败不会丢失或重复记录。
+    :return: 归档的记录数
+    """
+    condition = QueryHistory.created_at < cutoff
+    if include_deleted:
+        condition = or_(condition, QueryHistory.status == 1)
+
+    # 先锁定选中的记录，避免迁入之后、删除之前记录被修改
+    ids = db.session.execute(
+        select(QueryHistory.id)
+        .where(QueryHistory.id >= start_id, QueryHistory.id < end_id, condition)
+        .with_for_update()
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    columns = [column.name for column in QueryHistory.__table__.columns]
+    db.session.execute(
+        insert(QueryHistoryArchive.__table__).from_select(
+            columns + ['archived_at'],
+            select(*QueryHistory.__table__.columns, literal(datetime.now()))
+            .where(QueryHistory.id.in_(ids))
+        )
+    )
+    db.session.execute(delete(QueryHistory.__table__).where(QueryHistory.__table__.c.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
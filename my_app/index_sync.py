@@ -0,0 +1,115 @@
+# my_app/index_sync.py
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class SnapshotIndex:
+    """
+    由数据库整体构建、常驻进程内存的索引的公共部分（垃圾物品名称、用户名、知识文章）。
+
+    一致性保证：
+      - 第一次查询时加载，之后每隔 check_interval 秒比对一次数据库指纹，
+        其他进程造成的新增、修改、删除使指纹不同时整体重建；
+      - 本进程内的写入由子类在提交后增量应用到当前快照，并同步推进指纹；
+      - 重建在新的快照对象上完成后一次性替换 self._snapshot，查询先取出快照、之后只读取它，
+        重建期间的查询继续使用旧快照，不会看到新旧两份数据混在一起。
+
+    子类实现 _empty_snapshot()、_build_snapshot() 与 _db_fingerprint()，
+    需要在指纹之外另行判断是否重建时覆盖 _needs_rebuild()。
+    """
+
+    def __init__(self, check_interval=30.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = self._empty_snapshot()
+        self._loaded = False
+        self._fingerprint = None
+        self._last_check = 0.0
+
+    def _empty_snapshot(self):
+        raise NotImplementedError
+
+    def _build_snapshot(self):
+        """从数据库构建一份完整的新快照；在锁内、应用上下文中调用"""
+        raise NotImplementedError
+
+    def _db_fingerprint(self):
+        raise NotImplementedError
+
+    def _needs_rebuild(self):
+        """指纹未变时是否仍需重建（例如增量更新留下的过期条目过多）"""
+        return False
+
+    def load(self, force=True):
+        """
+        从数据库整体（重新）构建索引，需要在应用上下文中调用。
+        :param force: 为 False 时，若其他线程已完成加载则直接返回
+        """
+        with self._lock:
+            if not force and self._loaded:
+                return
+            # 先取指纹再读数据：期间的写入最多导致下次检查时多重建一次，不会被漏掉
+            fingerprint = self._db_fingerprint()
+            self._snapshot = self._build_snapshot()
+            self._fingerprint = fingerprint
+            self._loaded = True
+            self._last_check = time.monotonic()
+
+    def invalidate(self):
+        """标记索引失效，下一次查询时重建（用于绕过 ORM 的批量写入之后）"""
+        self._loaded = False
+
+    def ensure_fresh(self):
+        """按需加载，并在检查间隔到期后比对数据库指纹"""
+        if not self._loaded:
+            self.load(force=False)
+            return
+
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        if self._db_fingerprint() != self._fingerprint or self._needs_rebuild():
+            self.load()
+
+
+class PendingChanges:
+    """
+    本进程内通过 ORM 的修改：在 flush 事件中记录到会话的 info 中，事务提交后一次性应用，回滚时丢弃。
+    """
+
+    def __init__(self, key, apply, begin=None):
+        """
+        :param key: 在 session.info 中使用的键，各索引之间不能重复
+        :param apply: apply(changes, context)，事务提交后以记录的修改列表调用
+        :param begin: begin(connection)，在每个事务的第一次修改时调用一次，返回值作为 context 传给 apply
+        """
+        self.key = key
+        self._apply = apply
+        self._begin = begin
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+    def record(self, connection, target, change):
+        """在 ORM 的 after_insert / after_update / after_delete 事件中调用"""
+        session = Session.object_session(target)
+        if session is None:
+            return
+        pending = session.info.get(self.key)
+        if pending is None:
+            context = self._begin(connection) if self._begin is not None else None
+            pending = session.info[self.key] = (context, [])
+        pending[1].append(change)
+
+    def _after_commit(self, session):
+        pending = session.info.pop(self.key, None)
+        if pending is not None:
+            context, changes = pending
+            self._apply(changes, context)
+
+    def _after_rollback(self, session):
+        session.info.pop(self.key, None)
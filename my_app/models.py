@@ -5,6 +5,14 @@ from datetime import datetime
 
 class User(db.Model):
     __tablename__ = 'user'
+    # 管理员用户列表：按角色、状态筛选时按 id 倒序分页，按积分范围筛选时按 (points, id) 倒序分页；
+    # 索引末尾显式包含 id，排序直接由索引提供，不依赖存储引擎隐含主键的行为
+    __table_args__ = (
+        db.Index('ix_user_role_id', 'role', 'id'),
+        db.Index('ix_user_status_id', 'status', 'id'),
+        db.Index('ix_user_role_status_id', 'role', 'status', 'id'),
+        db.Index('ix_user_points_id', 'points', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
@@ -29,6 +37,10 @@ class User(db.Model):
 
 class KnowledgeArticle(db.Model):
     __tablename__ = 'knowledgearticle'
+    # 已发布文章按修改时间倒序分页
+    __table_args__ = (
+        db.Index('ix_knowledgearticle_status_updated', 'status', 'updated_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -65,8 +77,25 @@ class GarbageItem(db.Model):
         }
 
 
+class DataVersion(db.Model):
+    """
+    数据版本号：写入某类数据的事务同时把对应的版本号加一，
+    各进程内的缓存与索引比对版本号即可发现其他进程的新增、修改与删除。
+    """
+    __tablename__ = 'data_version'
+    name = db.Column(db.String(50), primary_key=True, comment='数据名称，例如表名')
+    version = db.Column(db.BigInteger, nullable=False, default=0, comment='版本号，每次写入加一')
+
+
 class QueryHistory(db.Model):
     __tablename__ = 'queryhistory'
+    # 用户查询本人未删除的记录 / 管理员查询指定用户的全部记录，均按时间倒序分页；
+    # 按日期范围导出全部用户的记录时沿 (created_at, id) 做范围扫描
+    __table_args__ = (
+        db.Index('ix_queryhistory_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_queryhistory_user_created', 'user_id', 'created_at'),
+        db.Index('ix_queryhistory_created_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True, comment='记录ID, 主键, 自增')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, comment='用户ID, 外键, 关联User(id)')
     query_type = db.Column(db.String(20), nullable=False, comment="查询方式 ('text' 或 'image')")
@@ -90,6 +119,74 @@ class QueryHistory(db.Model):
         }
 
 
+class QueryHistoryArchive(db.Model):
+    """
+    已归档的识别历史：超过保留期限或已被用户删除的记录，由 archive-history 命令从 queryhistory 迁入。
+    保留原记录ID，列与 queryhistory 相同，另加归档时间；只供管理员按需查询。
+    """
+    __tablename__ = 'queryhistory_archive'
+    __table_args__ = (
+        db.Index('ix_queryhistory_archive_user_created', 'user_id', 'created_at'),
+        db.Index('ix_queryhistory_archive_created_id', 'created_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='原识别历史记录ID')
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, comment='用户ID, 外键, 关联User(id)')
+    query_type = db.Column(db.String(20), nullable=False, comment="查询方式 ('text' 或 'image')")
+    query_content = db.Column(db.Text, nullable=False, comment='查询内容 (文字或图片URL)')
+    result_category = db.Column(db.String(50), nullable=False, comment='识别结果分类')
+    created_at = db.Column(db.DateTime, nullable=False, comment='查询时间')
+    status = db.Column(db.SmallInteger, nullable=False, comment='记录状态 (0: 可查询, 1: 已删除)')
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.now, comment='归档时间')
+
+    def to_dict(self):
+        return {**QueryHistory.to_dict(self), 'archived': True}
+
+
+class CategoryDailyStat(db.Model):
+    """识别历史按 (日期, 查询方式, 识别结果分类) 预聚合的计数，随识别历史的写入同步累加"""
+    __tablename__ = 'category_daily_stat'
+    day = db.Column(db.Date, primary_key=True, comment='日期')
+    query_type = db.Column(db.String(20), primary_key=True, comment="查询方式 ('text' 或 'image')")
+    result_category = db.Column(db.String(50), primary_key=True, comment='识别结果分类')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='识别次数')
+
+
+class CategoryHourlyStat(db.Model):
+    """按小时预聚合的分类计数，随识别历史的写入同步累加，只保留最近一段时间（见 STATS_HOURLY_RETENTION_DAYS）"""
+    __tablename__ = 'category_hourly_stat'
+    hour = db.Column(db.DateTime, primary_key=True, comment='小时（整点）')
+    query_type = db.Column(db.String(20), primary_key=True, comment="查询方式 ('text' 或 'image')")
+    result_category = db.Column(db.String(50), primary_key=True, comment='识别结果分类')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='识别次数')
+
+
+class CategoryMonthlyStat(db.Model):
+    """按月汇总的分类计数，由 compact-rollups 命令从日统计汇总已结束的月份"""
+    __tablename__ = 'category_monthly_stat'
+    month = db.Column(db.Date, primary_key=True, comment='月份（当月1日）')
+    query_type = db.Column(db.String(20), primary_key=True, comment="查询方式 ('text' 或 'image')")
+    result_category = db.Column(db.String(50), primary_key=True, comment='识别结果分类')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='识别次数')
+
+
+class UserDailyActivity(db.Model):
+    """
+    每个用户每天是否进行过识别，随识别历史的写入同步记录，用于统计活跃用户数。
+    不设外键：删除用户不改变历史的活跃用户统计。汇总为 ActiveUserStat 后定期清理。
+    """
+    __tablename__ = 'user_daily_activity'
+    day = db.Column(db.Date, primary_key=True, comment='日期')
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='用户ID')
+
+
+class ActiveUserStat(db.Model):
+    """按日、按月汇总的活跃用户数，由 compact-rollups 命令为已结束的日期与月份写入"""
+    __tablename__ = 'active_user_stat'
+    granularity = db.Column(db.String(5), primary_key=True, comment="汇总粒度 ('day' 或 'month')")
+    bucket = db.Column(db.Date, primary_key=True, comment='日期，或月份的1日')
+    users = db.Column(db.Integer, nullable=False, comment='活跃用户数')
+
+
 class Reward(db.Model):
     __tablename__ = 'reward'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='奖品ID, 主键, 自增')
@@ -107,6 +204,10 @@ class Reward(db.Model):
 
 class RedemptionHistory(db.Model):
     __tablename__ = 'redemptionhistory'
+    # 按用户查询兑换记录，按时间倒序排列
+    __table_args__ = (
+        db.Index('ix_redemptionhistory_user_created', 'user_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='兑换记录ID, 主键, 自增')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, comment='用户ID, 外键, 关联User(id)')
     reward_id = db.Column(db.Integer, db.ForeignKey('reward.id'), nullable=False, comment='奖品ID, 外键, 关联Reward(id)')
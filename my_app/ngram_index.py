@@ -0,0 +1,218 @@
+# my_app/ngram_index.py
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+def substring_score(query, text):
+    """
+    子串匹配的相关度得分，query 与 text 均为规范化后的字符串，且 query 必须是 text 的子串。
+      - 完全匹配: 3
+      - 前缀匹配: 2 ~ 3，名称越短（查询串覆盖越多）得分越高
+      - 其他位置: 1 ~ 2，匹配位置越靠前、名称越短得分越高
+    """
+    if text == query:
+        return 3.0
+    coverage = len(query) / len(text)
+    if text.startswith(query):
+        return 2.0 + coverage
+    return 1.0 + 0.5 * coverage + 0.5 / (1 + text.find(query))
+
+
+# 倒排列表中的条目编码为 (文本长度 << 40) | 文档ID，使列表天然按 (长度, ID) 排序
+_ID_BITS = 40
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def _entry(doc_id, text):
+    return (len(text) << _ID_BITS) | doc_id
+
+
+class NgramIndex:
+    """
+    内存中的 n-gram 倒排索引，用于代替前置通配符的 LIKE '%q%' 子串查询。
+
+    每个文档的一元组与二元组各建立一份倒排列表，另为文档开头的一元组与二元组建立前缀倒排列表。
+    列表为紧凑的整数数组，按 (文本长度, 文档ID) 升序排列。
+    查询时取查询串中最短的倒排列表作为候选集，再逐个校验是否真正包含查询串，
+    候选集的大小只与最稀有的那个 n-gram 有关，而与文档总数无关；
+    排序查询则利用"越短越相关"的有序性提前终止扫描。
+
+    倒排列表采用写时复制：增量更新时替换为新数组，正在遍历旧数组的查询不受影响。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._postings = {}
+        self._prefix_postings = {}
+        self._stale = 0
+
+    @staticmethod
+    def normalize(text):
+        """大小写不敏感，与 ilike 的语义保持一致"""
+        return text.casefold()
+
+    @staticmethod
+    def _grams(text):
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    @staticmethod
+    def _prefix_grams(text):
+        return {text[:1], text[:2]} if text else set()
+
+    @staticmethod
+    def _query_grams(query):
+        return {query[i:i + 2] for i in range(len(query) - 1)} or {query}
+
+    def __len__(self):
+        return len(self._texts)
+
+    @property
+    def stale_ratio(self):
+        """倒排列表中已失效条目（删除或改名后遗留）的比例，过高时应重建"""
+        return self._stale / max(1, len(self._texts))
+
+    def build(self, docs):
+        """
+        用 (doc_id, text) 序列整体重建索引。
+        """
+        texts = {}
+        postings = defaultdict(list)
+        prefix_postings = defaultdict(list)
+        for doc_id, text in docs:
+            norm = self.normalize(text)
+            texts[doc_id] = norm
+            entry = _entry(doc_id, norm)
+            for gram in self._grams(norm):
+                postings[gram].append(entry)
+            for gram in self._prefix_grams(norm):
+                prefix_postings[gram].append(entry)
+
+        compact = {gram: array('q', sorted(entries)) for gram, entries in postings.items()}
+        compact_prefix = {gram: array('q', sorted(entries)) for gram, entries in prefix_postings.items()}
+        with self._lock:
+            self._texts = texts
+            self._postings = compact
+            self._prefix_postings = compact_prefix
+            self._stale = 0
+
+    @staticmethod
+    def _insert(postings, gram, entry):
+        entries = postings.get(gram)
+        if entries is None:
+            postings[gram] = array('q', [entry])
+            return
+        pos = bisect_left(entries, entry)
+        if pos < len(entries) and entries[pos] == entry:
+            return
+        updated = array('q', entries)
+        updated.insert(pos, entry)
+        postings[gram] = updated
+
+    def add(self, doc_id, text):
+        """新增或更新一个文档"""
+        norm = self.normalize(text)
+        with self._lock:
+            old = self._texts.get(doc_id)
+            if old == norm:
+                return
+            if old is not None:
+                self._stale += 1
+            self._texts[doc_id] = norm
+            entry = _entry(doc_id, norm)
+            for gram in self._grams(norm):
+                self._insert(self._postings, gram, entry)
+            for gram in self._prefix_grams(norm):
+                self._insert(self._prefix_postings, gram, entry)
+
+    def remove(self, doc_id):
+        """删除一个文档；倒排列表中的残留条目在查询时被校验过滤"""
+        with self._lock:
+            if self._texts.pop(doc_id, None) is not None:
+                self._stale += 1
+
+    def text(self, doc_id):
+        return self._texts.get(doc_id)
+
+    def _matches(self, entries, q, prefix_only=False):
+        """逐个校验候选条目，按 (长度, ID) 升序产出 (doc_id, text)"""
+        texts = self._texts
+        for entry in entries:
+            doc_id = entry & _ID_MASK
+            text = texts.get(doc_id)
+            if text is None or len(text) != entry >> _ID_BITS:
+                continue  # 已删除或已改名的残留条目
+            if text.startswith(q) if prefix_only else q in text:
+                yield doc_id, text
+
+    def _shortest_postings(self, q):
+        candidates = None
+        for gram in self._query_grams(q):
+            entries = self._postings.get(gram)
+            if entries is None:
+                return None
+            if candidates is None or len(entries) < len(candidates):
+                candidates = entries
+        return candidates
+
+    def search(self, query, after=None):
+        """
+        按 (文本长度, 文档ID) 升序逐个产出包含 query（不区分大小写）的文档。
+        :param after: 上一页最后一个文档的 (文本长度, 文档ID)，从其之后继续产出，用于分页
+        :return: 生成器，元素为 (doc_id, normalized_text)
+        """
+        q = self.normalize(query)
+        if not q:
+            return
+        candidates = self._shortest_postings(q)
+        if candidates is None:
+            return
+        if after is not None:
+            # 倒排列表有序，二分定位到游标之后的位置，memoryview 切片不复制数组
+            start = bisect_right(candidates, (after[0] << _ID_BITS) | after[1])
+            candidates = memoryview(candidates)[start:]
+        yield from self._matches(candidates, q)
+
+    def search_ranked(self, query, limit=10):
+        """
+        返回得分最高的 limit 个匹配文档（得分见 substring_score）。
+        :return: [(doc_id, score), ...]，按得分降序，同分时名称更短、ID 更小者优先
+        """
+        q = self.normalize(query)
+        if not q or limit <= 0:
+            return []
+
+        # 1. 完全匹配与前缀匹配：前缀倒排列表按长度升序，得分随长度单调递减，取满即止
+        results = []
+        prefix_entries = self._prefix_postings.get(q[:2], ())
+        for doc_id, text in self._matches(prefix_entries, q, prefix_only=True):
+            results.append((doc_id, substring_score(q, text)))
+            if len(results) == limit:
+                return results
+
+        candidates = self._shortest_postings(q)
+        if candidates is None:
+            return results
+
+        # 2. 其他位置的匹配：得分不超过 1.25 + 0.5 * len(q) / 长度，
+        #    当已选出的结果都不低于后续文档可能达到的最高分时即可停止
+        need = limit - len(results)
+        heap = []
+        for doc_id, text in self._matches(candidates, q):
+            if text.startswith(q):
+                continue
+            if len(heap) == need and heap[0][0] >= 1.25 + 0.5 * len(q) / len(text):
+                break
+            item = (substring_score(q, text), -len(text), -doc_id)
+            if len(heap) < need:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        results.extend((-neg_id, score) for score, _, neg_id in sorted(heap, reverse=True))
+        return results
@@ -0,0 +1,82 @@
+# my_app/pagination.py
+import base64
+import heapq
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values):
+    """
+    将上一页最后一条记录的排序键编码为不透明的游标字符串（URL 安全的 base64）。
+    支持 int、str 与 datetime 类型的值。
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, types):
+    """
+    解析游标字符串。
+    :param types: 与排序键一一对应的类型，例如 (datetime, int)
+    :raises ValueError: 游标格式不合法
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError
+        values = []
+        for value, value_type in zip(payload, types):
+            if value_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif isinstance(value, value_type) and not isinstance(value, bool):
+                values.append(value)
+            else:
+                raise ValueError
+        return tuple(values)
+    except (ValueError, TypeError, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("无效的游标")
+
+
+def keyset_after(columns, values, descending=True):
+    """
+    生成"排在游标之后"的过滤条件，例如按 (a, b) 降序时为 a < x OR (a = x AND b < y)。
+    展开写法而非行值比较，以便 MySQL 使用 (a, b) 上的联合索引做范围扫描。
+    """
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        beyond = column < value if descending else column > value
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        conditions.append(and_(*equal_prefix, beyond) if equal_prefix else beyond)
+    return or_(*conditions)
+
+
+def paginate_keyset(query, limit, sort_key):
+    """
+    执行已按排序键排序、且已附加游标条件的查询，多取一条以判断是否还有下一页。
+    :param sort_key: 从一行结果中取出排序键元组的函数
+    :return: (rows, next_cursor)，没有下一页时 next_cursor 为 None
+    """
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*sort_key(rows[-1]))
+
+
+def paginate_keyset_merged(queries, limit, sort_key, descending=True):
+    """
+    与 paginate_keyset 相同，但结果来自多张表（例如在线表与归档表）：
+    每个查询都已按相同的排序键排序并附加游标条件，各自取 limit + 1 条后归并。
+    :return: (rows, next_cursor)
+    """
+    pages = [query.limit(limit + 1).all() for query in queries]
+    rows = list(islice(heapq.merge(*pages, key=sort_key, reverse=descending), limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*sort_key(rows[-1]))
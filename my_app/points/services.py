@@ -19,7 +19,8 @@ def redeem_reward_service(user, reward_id, phone_number, address):
         return None, "用户积分不足"
 
     try:
-        user.points -= reward.points_cost
+        # 以 points = points - 花费 的形式更新，不覆盖同时写入的识别积分
+        user.points = User.points - reward.points_cost
         reward.stock -= 1
         new_redemption = RedemptionHistory(
             user_id=user.id,
@@ -0,0 +1,46 @@
+# my_app/process_local.py
+import os
+import threading
+
+
+class ProcessLocal:
+    """
+    按进程惰性创建的对象，用于后台线程、线程池及其队列。
+    线程不会在 fork 后的子进程中存活：gunicorn 以 preload 方式启动时，主进程中创建的线程
+    在各 worker 中并不存在，沿用父进程的队列或线程池只会让提交的任务永远无人处理。
+    因此以进程号判断，每个进程第一次 get() 时调用 factory 创建自己的一份，之后直接复用。
+    """
+
+    def __init__(self, factory, lock=None):
+        """
+        :param factory: 无参函数，返回本进程使用的对象；在锁内调用，每个进程只调用一次
+        :param lock: factory 需要与其他状态共用的锁，默认使用独立的锁
+        """
+        self._factory = factory
+        self._lock = lock if lock is not None else threading.Lock()
+        self._pid = None
+        self._value = None
+
+    def get(self):
+        """返回本进程的对象，尚未创建时先创建"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def peek(self):
+        """返回本进程已创建的对象；尚未创建（或只有 fork 前父进程的那一份）时返回 None"""
+        return self._value if self._pid == os.getpid() else None
+
+    def reset(self):
+        """
+        丢弃本进程的对象，下次 get() 时按新的配置重新创建。
+        :return: 被丢弃的对象（由调用方关闭），本进程尚未创建时返回 None
+        """
+        with self._lock:
+            value = self.peek()
+            self._value = None
+            self._pid = None
+        return value
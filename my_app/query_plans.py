@@ -0,0 +1,205 @@
+# my_app/query_plans.py
+"""
+业务查询的执行计划检查。
+
+依次调用各个只读的业务查询，捕获其实际发出的 SQL，再逐条执行 EXPLAIN，
+发现全表扫描、文件排序 (filesort) 或临时表时报告失败。
+用法: flask --app run check-query-plans [--user-id 1]
+以 MySQL 的执行计划为准；SQLite 下按 EXPLAIN QUERY PLAN 做近似判断，仅供开发时参考。
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from .models import db, User, KnowledgeArticle
+from .pagination import encode_cursor
+
+FULL_SCAN = 'full_scan'
+FILESORT = 'filesort'
+TEMPORARY = 'temporary'
+
+
+@contextmanager
+def capture_queries():
+    """捕获代码块内通过 db.engine 执行的 SELECT 语句，产出 [(statement, parameters), ...]"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(statement, parameters):
+    """
+    返回 (执行计划的文字描述列表, 发现的问题集合)
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    problems = set()
+    lines = []
+
+    if dialect == 'mysql':
+        for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings():
+            extra = row.get('Extra') or ''
+            lines.append(f"{row['table']}: type={row['type']} key={row['key']} {extra}".rstrip())
+            # ALL 为全表扫描，index 为按索引顺序读完整个索引，同样与数据量成正比
+            if row['type'] in ('ALL', 'index'):
+                problems.add(FULL_SCAN)
+            if 'Using filesort' in extra:
+                problems.add(FILESORT)
+            if 'Using temporary' in extra:
+                problems.add(TEMPORARY)
+    elif dialect == 'sqlite':
+        for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            detail = row[-1]
+            lines.append(detail)
+            # SCAN 表示读完整张表或整个索引（含 USING INDEX / USING COVERING INDEX），带检索条件时为 SEARCH
+            if detail.startswith('SCAN ') and detail != 'SCAN CONSTANT ROW':
+                problems.add(FULL_SCAN)
+            if 'TEMP B-TREE FOR ORDER BY' in detail or 'TEMP B-TREE FOR RIGHT PART OF ORDER BY' in detail:
+                problems.add(FILESORT)
+            if 'TEMP B-TREE FOR GROUP BY' in detail or 'TEMP B-TREE FOR DISTINCT' in detail:
+                problems.add(TEMPORARY)
+    else:
+        raise click.ClickException(f"不支持的数据库类型: {dialect}")
+
+    return lines, problems
+
+
+def _scenarios(user_id, article_id):
+    """
+    待检查的业务查询: (名称, 调用函数, 允许出现的问题, 原因)
+    只有读取的行数本身很少的查询，或当前配置下不会被调用的查询，才允许出现问题
+    """
+    from .admin.services import get_all_users_service, search_users_by_username_service, get_user_by_id_service
+    from .articles.services import (
+        get_published_articles_service, get_published_article_detail_service, search_articles_by_title_service
+    )
+    from .history.services import (
+        get_history_by_user_id_service, get_category_statistics_service, export_history_service
+    )
+    from .history.rollups import get_trend_series, get_active_users
+    from .points.services import get_rewards_service, get_redemption_history_service
+    from .recognition.services import _search_garbage_items
+
+    now = datetime.now()
+    history_cursor = encode_cursor(now, 2 ** 31 - 1)
+    article_cursor = encode_cursor(now, 2 ** 31 - 1)
+    user_cursor = encode_cursor(2 ** 31 - 1)
+    user_points_cursor = encode_cursor(200, 2 ** 31 - 1)
+
+    def export(**kwargs):
+        # 导出接口返回生成器，取出第一行即可让其发出查询
+        return list(islice(export_history_service(**kwargs), 1))
+
+    def search_garbage_items_sql():
+        # 关闭内存索引时的回退路径
+        app = current_app._get_current_object()
+        enabled = app.config.get('GARBAGE_INDEX_ENABLED', True)
+        app.config['GARBAGE_INDEX_ENABLED'] = False
+        try:
+            return _search_garbage_items('电池', 10)
+        finally:
+            app.config['GARBAGE_INDEX_ENABLED'] = enabled
+
+    if current_app.config.get('GARBAGE_INDEX_ENABLED', True):
+        garbage_sql_allowed = {FULL_SCAN, FILESORT}
+        garbage_sql_reason = 'GARBAGE_INDEX_ENABLED 开启，文字识别不走此路径'
+    else:
+        garbage_sql_allowed, garbage_sql_reason = set(), ''
+
+    return [
+        ('识别历史（用户，首页含总数）', lambda: get_history_by_user_id_service(user_id), set(), ''),
+        ('识别历史（用户，翻页）', lambda: get_history_by_user_id_service(user_id, cursor=history_cursor), set(), ''),
+        ('识别历史（用户，按方式与类别筛选）', lambda: get_history_by_user_id_service(
+            user_id, cursor=history_cursor, query_type='image', result_category='有害垃圾'), set(), ''),
+        ('识别历史（管理员，翻页）', lambda: get_history_by_user_id_service(
+            user_id, is_admin=True, cursor=history_cursor), set(), ''),
+        ('识别历史（管理员，含归档）', lambda: get_history_by_user_id_service(
+            user_id, is_admin=True, cursor=history_cursor, include_archived=True), set(), ''),
+        ('导出识别历史（用户，日期范围）', lambda: export(
+            user_id=user_id, start=now.date() - timedelta(days=30), end=now.date()), set(), ''),
+        ('导出识别历史（用户，含归档）', lambda: export(user_id=user_id, include_archived=True), set(), ''),
+        ('导出识别历史（全部用户，日期范围）', lambda: export(
+            start=now.date() - timedelta(days=1), end=now.date()), set(), ''),
+        ('导出识别历史（全部用户，日期范围，含归档）', lambda: export(
+            start=now.date() - timedelta(days=1), end=now.date(), include_archived=True), set(), ''),
+        ('识别统计（日期范围）', lambda: get_category_statistics_service(now.date() - timedelta(days=30), now.date()),
+         {TEMPORARY}, '按类别汇总的是日期范围内的预聚合行，行数很少'),
+        ('识别趋势（按小时）', lambda: get_trend_series('hour', now.date() - timedelta(days=1), now.date()), set(), ''),
+        ('识别趋势（按日）', lambda: get_trend_series('day', now.date() - timedelta(days=29), now.date()), set(), ''),
+        ('识别趋势（按月）', lambda: get_trend_series('month', now.date() - timedelta(days=365), now.date()), set(), ''),
+        ('活跃用户（按日）', lambda: get_active_users('day', now.date() - timedelta(days=29), now.date()), set(), ''),
+        ('活跃用户（按月）', lambda: get_active_users('month', now.date() - timedelta(days=365), now.date()), set(), ''),
+        ('兑换记录（用户）', lambda: get_redemption_history_service(user_id), set(), ''),
+        ('奖品列表', get_rewards_service, {FULL_SCAN}, '奖品表很小，整表读取'),
+        ('文章列表（首页）', lambda: get_published_articles_service(20), set(), ''),
+        ('文章列表（翻页）', lambda: get_published_articles_service(20, article_cursor), set(), ''),
+        ('文章详情', lambda: get_published_article_detail_service(article_id), set(), ''),
+        ('文章标题模糊查询', lambda: search_articles_by_title_service('垃圾'),
+         {FULL_SCAN}, "LIKE '%q%' 无法使用索引；知识文章由管理员编写，表很小"),
+        ('文字识别（关闭内存索引时的 SQL 查询）', search_garbage_items_sql, garbage_sql_allowed, garbage_sql_reason),
+        ('用户详情', lambda: get_user_by_id_service(user_id), set(), ''),
+        ('用户列表（无筛选，翻页）', lambda: get_all_users_service(cursor=user_cursor), set(), ''),
+        ('用户列表（按角色）', lambda: get_all_users_service(cursor=user_cursor, role=1), set(), ''),
+        ('用户列表（按角色与状态）', lambda: get_all_users_service(cursor=user_cursor, role=1, status=0), set(), ''),
+        ('用户列表（按状态）', lambda: get_all_users_service(cursor=user_cursor, status=1), set(), ''),
+        ('用户列表（按积分范围）', lambda: get_all_users_service(
+            cursor=user_points_cursor, min_points=100, max_points=200), set(), ''),
+        ('用户名前缀搜索', lambda: search_users_by_username_service('admin', match='prefix'), set(), ''),
+    ]
+
+
+@click.command('check-query-plans')
+@click.option('--user-id', type=int, help='用于执行查询的用户ID，默认取ID最小的用户')
+@click.option('--verbose', is_flag=True, help='输出每条语句的执行计划')
+@with_appcontext
+def check_query_plans_command(user_id, verbose):
+    """检查各业务查询的执行计划，出现全表扫描、文件排序或临时表时以非零状态码退出"""
+    if user_id is None:
+        user_id = db.session.query(User.id).order_by(User.id).limit(1).scalar()
+        if user_id is None:
+            raise click.ClickException("数据库中没有用户，请先创建用户或通过 --user-id 指定")
+    article_id = db.session.query(KnowledgeArticle.id).filter_by(status=0).order_by(KnowledgeArticle.id).limit(1).scalar() or 1
+
+    failures = 0
+    for name, run, allowed, reason in _scenarios(user_id, article_id):
+        with capture_queries() as captured:
+            try:
+                run()
+            except Exception as e:
+                # 例如文章不存在时的 404，只需检查已经发出的语句
+                click.echo(f"  (调用 {name} 时出现异常: {e.__class__.__name__})")
+
+        for statement, parameters in captured:
+            lines, problems = explain(statement, parameters)
+            unexpected = problems - allowed
+            if unexpected:
+                failures += 1
+                status = '❌ ' + ', '.join(sorted(unexpected))
+            elif problems:
+                status = f"⚠️ 已知: {', '.join(sorted(problems))}（{reason}）"
+            else:
+                status = '✅'
+            click.echo(f"{status} {name}")
+            if verbose or unexpected:
+                click.echo(f"    {' '.join(statement.split())[:300]}")
+                for line in lines:
+                    click.echo(f"      {line}")
+
+    db.session.rollback()
+    if failures:
+        raise click.ClickException(f"{failures} 条查询的执行计划不符合要求")
+    click.echo("✅ 所有业务查询均使用了索引")
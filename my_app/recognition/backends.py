@@ -0,0 +1,70 @@
+# my_app/recognition/backends.py
+import copy
+
+import torch
+import torch.nn as nn
+
+# 可选的 CPU 推理后端
+#   eager         - 原始的 fp32 动态图模型
+#   torchscript   - trace 后冻结的 TorchScript 模型，去除 Python 调度开销
+#   dynamic_int8  - 动态 int8 量化（仅量化全连接层，无需校准数据）
+#   static_int8   - FX 静态 int8 量化（卷积与全连接层均量化，需要校准数据）
+#   channels_last - NHWC 内存布局的 fp32 模型，对 CPU 卷积更友好
+BACKENDS = ('eager', 'torchscript', 'dynamic_int8', 'static_int8', 'channels_last')
+
+INPUT_SHAPE = (1, 3, 224, 224)
+
+
+class ChannelsLast(nn.Module):
+    """把输入转换为 channels_last 布局后再交给同样布局的模型"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def build_backend(model, backend, calibration_batches=None):
+    """
+    基于已加载权重的 fp32 模型构建指定的推理后端。
+
+    :param model: eval 模式下的 fp32 ResNet-18
+    :param backend: BACKENDS 中的一个名称
+    :param calibration_batches: 静态量化使用的校准输入（形状为 (N, C, H, W) 的张量列表），static_int8 必须提供
+    :return: 可直接以 model(batch_tensor) 方式调用的模型
+    :raises ValueError: 未知的后端，或 static_int8 缺少校准数据
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的推理后端: {backend}，可选值: {', '.join(BACKENDS)}")
+
+    example = torch.zeros(INPUT_SHAPE)
+
+    if backend == 'eager':
+        return model
+
+    if backend == 'torchscript':
+        with torch.inference_mode():
+            traced = torch.jit.trace(model, example)
+        return torch.jit.freeze(traced.eval())
+
+    if backend == 'dynamic_int8':
+        return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+
+    if backend == 'static_int8':
+        if not calibration_batches:
+            # 以随机输入校准得到的量化参数与真实图片的激活分布不符，准确率会严重下降
+            raise ValueError("static_int8 后端需要校准数据")
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+        qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+        prepared = prepare_fx(copy.deepcopy(model), qconfig_mapping, (example,))
+        with torch.inference_mode():
+            for batch in calibration_batches:
+                prepared(batch)
+        return convert_fx(prepared).eval()
+
+    # channels_last
+    return ChannelsLast(copy.deepcopy(model)).eval()
@@ -0,0 +1,162 @@
+# my_app/recognition/batcher.py
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import torch
+
+from ..process_local import ProcessLocal
+
+
+class _Request:
+    """队列中的单个推理请求"""
+    __slots__ = ('tensor', 'future', 'enqueued_at')
+
+    def __init__(self, tensor):
+        self.tensor = tensor
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    微批处理推理引擎。
+    将并发到达的单张图片推理请求收集起来，合并为一次批量前向计算，
+    再把结果分别交还给各自的调用方。
+
+    一个批次在以下任一条件满足时被执行：
+      - 已收集到 max_batch_size 个请求；
+      - 批次中最早的请求已等待了 max_wait_ms 毫秒。
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10.0, stats_window=1000):
+        """
+        :param run_batch: 批量推理函数，接收形状为 (N, C, H, W) 的张量，返回长度为 N 的结果列表
+        :param max_batch_size: 单个批次的最大图片数
+        :param max_wait_ms: 批次中第一个请求的最长等待时间（毫秒）
+        :param stats_window: 用于计算等待时间分位数的最近样本数
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._lock = threading.Lock()
+        self._queue = ProcessLocal(self._start)
+
+        # --- 统计信息 ---
+        self._batch_sizes = Counter()
+        self._wait_samples = deque(maxlen=stats_window)
+        self._total_requests = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def _start(self):
+        """在本进程中启动后台工作线程，返回其请求队列"""
+        requests = queue.Queue()
+        threading.Thread(target=self._run, args=(requests,), name='inference-batcher', daemon=True).start()
+        return requests
+
+    def submit(self, tensor, timeout=None):
+        """
+        提交一个形状为 (1, C, H, W) 的输入张量，阻塞直到得到该图片自己的推理结果。
+        """
+        request = _Request(tensor)
+        self._queue.get().put(request)
+        return request.future.result(timeout=timeout)
+
+    def close(self):
+        """
+        停止本进程的工作线程，已提交的请求仍会执行完。
+        用于不再有调用方使用该实例时（例如 init_app 用新的实例替换它）。
+        """
+        requests = self._queue.reset()
+        if requests is not None:
+            requests.put(None)
+
+    def _collect(self, requests):
+        """
+        阻塞地取出第一个请求，然后在等待窗口内尽量凑满一个批次。
+        遇到 close() 放入的结束标记时返回已收集的请求，结束标记留给下一次调用，此时返回空批次。
+        """
+        first = requests.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    request = requests.get_nowait()
+                else:
+                    request = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self, requests):
+        while True:
+            batch = self._collect(requests)
+            if not batch:
+                return
+            started_at = time.perf_counter()
+            self._record(batch, started_at)
+
+            try:
+                results = self.run_batch(torch.cat([r.tensor for r in batch], dim=0))
+            except Exception as e:
+                for r in batch:
+                    r.future.set_exception(e)
+                continue
+
+            for r, result in zip(batch, results):
+                r.future.set_result(result)
+
+    def _record(self, batch, started_at):
+        with self._lock:
+            self._batch_sizes[len(batch)] += 1
+            for r in batch:
+                wait = started_at - r.enqueued_at
+                self._wait_samples.append(wait)
+                self._total_wait += wait
+                self._max_wait_seen = max(self._max_wait_seen, wait)
+            self._total_requests += len(batch)
+
+    def stats(self):
+        """
+        返回批大小分布与排队等待时间的统计信息，用于调优 max_batch_size 与 max_wait_ms。
+        """
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            total_batches = sum(self._batch_sizes.values())
+            total_requests = self._total_requests
+            avg_wait = self._total_wait / total_requests if total_requests else 0.0
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            max_wait_seen = self._max_wait_seen
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))]
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'total_requests': total_requests,
+            'total_batches': total_batches,
+            'avg_batch_size': total_requests / total_batches if total_batches else 0.0,
+            'batch_size_distribution': batch_sizes,
+            'queue_wait_ms': {
+                'avg': avg_wait * 1000,
+                'p50': percentile(50) * 1000,
+                'p95': percentile(95) * 1000,
+                'p99': percentile(99) * 1000,
+                'max': max_wait_seen * 1000,
+            },
+        }
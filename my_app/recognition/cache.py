@@ -0,0 +1,109 @@
+# my_app/recognition/cache.py
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+try:
+    import imagehash
+except ImportError:  # 感知哈希为可选依赖，缺失时退回内容摘要
+    imagehash = None
+
+
+def content_digest(data):
+    """上传内容的 SHA-256 摘要，只有字节完全相同的图片才会命中"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_digest(data):
+    """
+    图片的感知哈希（与 CleanData.py 去重使用的 phash 算法相同），
+    重新压缩、轻微缩放后的同一张照片也能命中。
+    phash 只需要 32x32 的灰度图：JPEG 以 draft 模式直接按 1/8 等比例解码为灰度，
+    不解码完整的原图，缓存命中的开销远小于一次预处理。
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('L', (64, 64))
+        return f"phash:{imagehash.phash(img)}"
+
+
+class ResultCache:
+    """
+    图片识别结果缓存，带容量上限 (LRU) 与过期时间 (TTL)。
+    缓存随进程存在：模型只在进程启动时加载一次，替换模型文件后需重启服务，缓存也随之清空。
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, key_type='sha256'):
+        """
+        :param max_entries: 最多缓存的结果条数
+        :param ttl: 单条结果的存活时间（秒），<=0 表示不过期
+        :param key_type: 缓存键类型，'sha256' 或 'phash'
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.key_type = key_type if (key_type != 'phash' or imagehash is not None) else 'sha256'
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key_for(self, data, digest=None):
+        """
+        根据图片内容计算缓存键，图片无法解码时返回 None
+        :param digest: 调用方已计算的 content_digest(data)，sha256 模式下直接作为缓存键
+        """
+        if self.key_type == 'phash':
+            try:
+                return perceptual_digest(data)
+            except Exception:
+                return None
+        return digest or content_digest(data)
+
+    def get(self, key):
+        """命中时返回 (category, probability)，否则返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        now = time.monotonic()
+        expires_at = now + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'key_type': self.key_type,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
@@ -1,12 +1,36 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+from torchvision import models
+import io
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .backends import build_backend
+from .batcher import MicroBatcher
+from .cache import ResultCache
+from .pool import inference_pool
+from ..process_local import ProcessLocal
+from .preprocess import Preprocessor
 
 # --- 全局变量，用于存储加载后的模型和类别，避免重复加载 ---
 MODEL = None
 CLASS_NAMES = None
+_LOAD_LOCK = threading.Lock()
+
+# --- 微批处理推理引擎，由 init_app 根据配置创建；为 None 时逐张推理 ---
+BATCHER = None
+# --- 识别结果缓存，由 init_app 根据配置创建；为 None 时不缓存 ---
+RESULT_CACHE = None
+# --- 推理后端（见 backends.BACKENDS），以及静态量化使用的校准图片目录 ---
+BACKEND = 'eager'
+CALIBRATION_DIR = None
+# --- 图片预处理流水线，构建一次后重复使用 ---
+PREPROCESSOR = Preprocessor()
+# --- 多图识别时并行预处理使用的线程池，按进程惰性创建 ---
+PREPROCESS_WORKERS = 4
+_PREPROCESS_POOL = ProcessLocal(
+    lambda: ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS, thread_name_prefix='preprocess')
+)
 
 # --- 常量定义 ---
 # 获取当前文件所在的目录，并拼接模型和类别文件的绝对路径
@@ -15,13 +39,63 @@ MODEL_PATH = os.path.join(BASE_DIR, 'model/garbage_classifier_resnet18.pth')
 CLASS_NAMES_FILE = os.path.join(BASE_DIR, 'class_names.txt')
 
 
-def _load_model_and_classes():
+def init_app(app):
     """
-    一个内部函数，用于加载模型和类别名称到全局变量。
-    此函数只在第一次需要时执行。
+    根据应用配置初始化推理引擎。
+    INFERENCE_BATCHING 开启时，并发的识别请求会被合并为批量前向计算。
     """
-    global MODEL, CLASS_NAMES
+    global BATCHER, RESULT_CACHE, BACKEND, CALIBRATION_DIR, PREPROCESS_WORKERS, PREPROCESSOR
+    BACKEND = app.config.get('INFERENCE_BACKEND', 'eager')
+    CALIBRATION_DIR = app.config.get('INFERENCE_CALIBRATION_DIR')
+    PREPROCESS_WORKERS = app.config.get('RECOGNITION_PREPROCESS_WORKERS', 4)
+    # 按新的线程数重建预处理线程池，已有的线程池执行完已提交的任务后退出
+    previous_pool = _PREPROCESS_POOL.reset()
+    if previous_pool is not None:
+        previous_pool.shutdown(wait=False)
+    PREPROCESSOR = Preprocessor(max_pixels=app.config.get('RECOGNITION_MAX_IMAGE_PIXELS', 50_000_000))
+
+    batching = app.config.get('INFERENCE_BATCHING', False)
+    max_batch_size = app.config.get('INFERENCE_MAX_BATCH_SIZE', 8)
+    max_workers = app.config.get('INFERENCE_POOL_WORKERS', 8)
+    if batching:
+        # 每个批次的图片来自不同的工作线程，线程数少于批大小时批次只能等到超时才提交
+        max_workers = max(max_workers, max_batch_size)
+
+    # 识别请求经由有界工作池执行，队列满时快速拒绝
+    inference_pool.configure(
+        max_workers=max_workers,
+        max_queue=app.config.get('INFERENCE_POOL_QUEUE_SIZE', 16),
+        retry_after=app.config.get('INFERENCE_POOL_RETRY_AFTER', 1)
+    )
+
+    # 重新初始化时停止旧的批处理线程，否则每次 create_app 都会遗留一个空闲线程
+    if BATCHER is not None:
+        BATCHER.close()
+    if batching:
+        BATCHER = MicroBatcher(
+            _run_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=app.config.get('INFERENCE_MAX_WAIT_MS', 10)
+        )
+    else:
+        BATCHER = None
+
+    # RECOGNITION_CACHE_SIZE 为 0 时关闭结果缓存
+    if app.config.get('RECOGNITION_CACHE_SIZE', 0) > 0:
+        RESULT_CACHE = ResultCache(
+            max_entries=app.config['RECOGNITION_CACHE_SIZE'],
+            ttl=app.config.get('RECOGNITION_CACHE_TTL', 3600),
+            key_type=app.config.get('RECOGNITION_CACHE_KEY', 'sha256')
+        )
+    else:
+        RESULT_CACHE = None
+
 
+def load_fp32_model():
+    """
+    从磁盘加载原始的 fp32 模型与类别名称，不做任何后端优化。
+    :return: (model, class_names)
+    """
     # 检查文件是否存在
     if not os.path.exists(CLASS_NAMES_FILE):
         raise FileNotFoundError(f"类别名称文件未找到: {CLASS_NAMES_FILE}")
@@ -30,12 +104,12 @@ def _load_model_and_classes():
 
     # 1. 加载类别名称
     with open(CLASS_NAMES_FILE, 'r', encoding='utf-8') as f:
-        CLASS_NAMES = [line.strip() for line in f.readlines()]
+        class_names = [line.strip() for line in f.readlines()]
 
     # 2. 定义与训练时完全相同的模型架构
     model_instance = models.resnet18(weights=None)
     num_ftrs = model_instance.fc.in_features
-    model_instance.fc = nn.Linear(num_ftrs, len(CLASS_NAMES))
+    model_instance.fc = nn.Linear(num_ftrs, len(class_names))
 
     # 3. 加载已经训练好的模型权重
     # map_location=torch.device('cpu') 确保模型即使在没有GPU的服务器上也能运行
@@ -43,31 +117,95 @@ def _load_model_and_classes():
     model_instance.load_state_dict(checkpoint['model_state_dict'])
     model_instance.eval()  # 切换到评估模式
 
-    MODEL = model_instance
-    # print("--- 图像识别模型和类别已成功加载到内存。 ---")
+    return model_instance, class_names
+
 
+def list_image_files(image_dir):
+    """递归列出目录中的图片文件，按路径排序"""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(image_dir)
+        for name in files
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif'))
+    )
 
-def _preprocess_image(image_path):
+
+def load_calibration_batches(image_dir, limit=64, batch_size=8):
     """
-    对单个图片进行预处理，使其符合模型输入要求。
-    与验证集的预处理方式保持一致。
+    读取目录中的图片作为静态量化的校准数据。
+    :return: 形状为 (N, C, H, W) 的张量列表
+    """
+    paths = list_image_files(image_dir)[:limit]
+    tensors = [_preprocess_image(path) for path in paths]
+    return [torch.cat(tensors[i:i + batch_size]) for i in range(0, len(tensors), batch_size)]
+
+
+def _load_model_and_classes():
+    """
+    一个内部函数，用于加载模型和类别名称到全局变量。
+    此函数只在第一次需要时执行，加锁避免并发的首批请求重复加载。
+    加载后的模型会按 BACKEND 转换为对应的推理后端。
+    :raises ValueError: static_int8 后端未配置校准图片目录，或目录中没有图片
+    """
+    global MODEL, CLASS_NAMES
+
+    with _LOAD_LOCK:
+        if MODEL is not None:
+            return
+
+        model_instance, class_names = load_fp32_model()
+
+        calibration = None
+        if BACKEND == 'static_int8':
+            if not CALIBRATION_DIR:
+                raise ValueError("INFERENCE_BACKEND=static_int8 时必须通过 INFERENCE_CALIBRATION_DIR 指定校准图片目录")
+            calibration = load_calibration_batches(CALIBRATION_DIR)
+            if not calibration:
+                raise ValueError(f"校准图片目录中没有图片: {CALIBRATION_DIR}")
+
+        CLASS_NAMES = class_names
+        MODEL = build_backend(model_instance, BACKEND, calibration)
+        # print("--- 图像识别模型和类别已成功加载到内存。 ---")
+
+
+def warm_up():
+    """
+    在服务启动阶段（gunicorn 主进程 fork 之前）预加载模型与类别名称。
+    这样首个用户请求不再承担 torch.load 的开销，
+    且各 worker 进程以写时复制的方式共享主进程中的同一份权重。
+    """
+    _load_model_and_classes()
+
+
+def init_worker(num_threads):
+    """
+    worker 进程启动后调用：设置本进程 torch 的算子内并行线程数，
+    避免多个 worker 各自按 CPU 核数开线程而互相争抢；
+    再执行一次空推理，使计算内核在接收真实请求前完成初始化。
+    """
+    torch.set_num_threads(max(1, int(num_threads)))
+    if MODEL is None:
+        _load_model_and_classes()
+    with torch.inference_mode():
+        MODEL(torch.zeros(1, 3, 224, 224))
+
+
+def _preprocess_image(image, out=None):
     """
-    transform = transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
+    对单个图片进行预处理，使其符合模型输入要求。
+    与验证集的预处理方式保持一致（Resize(256) -> CenterCrop(224) -> Normalize）。
 
-    image = Image.open(image_path).convert('RGB')
-    return transform(image).unsqueeze(0)  # 增加一个批次维度
+    :param image: 图片的本地文件路径，或包含图片内容的文件对象（如 io.BytesIO）
+    :param out: 可选的预分配输入张量 (1, 3, 224, 224)，结果直接写入其中
+    """
+    return PREPROCESSOR(image, out)
 
 
 def _predict(model, input_tensor, class_names):
     """
     使用加载好的模型进行预测。
     """
-    with torch.no_grad():
+    with torch.inference_mode():
         output = model(input_tensor)
         # 使用 softmax 将输出转换为概率分布
         probabilities = torch.nn.functional.softmax(output[0], dim=0)
@@ -82,26 +220,130 @@ def _predict(model, input_tensor, class_names):
         return top_label, top_prob[0].item()
 
 
-def classify_image(image_path):
+def _predict_batch(model, batch_tensor, class_names, k=1):
+    """
+    对一个批次的图片进行预测。
+    :param batch_tensor: 形状为 (N, C, H, W) 的输入张量
+    :param k: 每张图片返回概率最高的前 k 个类别
+    :return: 长度为 N 的列表，每个元素为 [(category, probability), ...]
+    """
+    with torch.inference_mode():
+        output = model(batch_tensor)
+        probabilities = torch.nn.functional.softmax(output, dim=1)
+        top_probs, top_idxs = torch.topk(probabilities, min(k, len(class_names)), dim=1)
+
+        return [
+            [(class_names[idx], prob) for idx, prob in zip(idxs, probs)]
+            for idxs, probs in zip(top_idxs.tolist(), top_probs.tolist())
+        ]
+
+
+def _run_batch(batch_tensor):
+    """微批处理引擎的批量推理回调，每张图片返回 top-1 的 (category, probability)"""
+    return [top[0] for top in _predict_batch(MODEL, batch_tensor, CLASS_NAMES)]
+
+
+def get_inference_stats():
+    """返回微批处理引擎的批大小分布、排队等待时间、结果缓存的命中统计以及工作池的实时负载"""
+    stats = {'batching': False} if BATCHER is None else {'batching': True, **BATCHER.stats()}
+    stats['cache'] = RESULT_CACHE.stats() if RESULT_CACHE is not None else None
+    stats['pool'] = inference_pool.stats()
+    return stats
+
+
+def _cache_key(image, digest=None):
+    """只有内存中的图片内容才参与缓存，文件路径形式的输入直接跳过"""
+    if RESULT_CACHE is None or not isinstance(image, io.BytesIO):
+        return None
+    return RESULT_CACHE.key_for(image.getvalue(), digest)
+
+
+def lookup_cached_result(image, digest=None):
+    """
+    在进入推理工作池之前查询结果缓存，命中的请求不必占用工作线程。
+    :param digest: 调用方已计算的图片内容 SHA-256 摘要（例如用于存储键），避免重复计算
+    :return: (cache_key, cached)；未开启缓存时 cache_key 为 None，未命中时 cached 为 None
+    """
+    cache_key = _cache_key(image, digest)
+    if cache_key is None:
+        return None, None
+    return cache_key, RESULT_CACHE.get(cache_key)
+
+
+def classify_image(image, cache_key=None):
     """
     对外暴露的主函数，用于分类单个图像。
     它整合了模型加载、图像预处理和预测的全过程。
 
-    :param image_path: 要识别的图片的本地文件路径
+    :param image: 要识别的图片的本地文件路径，或直接包含图片内容的文件对象
+    :param cache_key: 调用方已通过 lookup_cached_result 查询过缓存（未命中）时传入，不再重复计算与查询
     :return: 一个元组 (category, probability)，例如 ('paper', 0.987)
     """
+    # 命中结果缓存时直接返回，不再执行模型
+    if cache_key is None:
+        cache_key, cached = lookup_cached_result(image)
+        if cached is not None:
+            return cached
+
     # 如果模型未加载，则先执行加载
     if MODEL is None:
         _load_model_and_classes()
 
     try:
-        # 1. 预处理图像
-        input_tensor = _preprocess_image(image_path)
+        # 1. 预处理图像，写入当前线程复用的缓冲区（推理完成前本线程一直在等待结果）
+        input_tensor = _preprocess_image(image, PREPROCESSOR.thread_buffer())
 
-        # 2. 进行预测
-        category, probability = _predict(MODEL, input_tensor, CLASS_NAMES)
+        # 2. 进行预测：开启微批处理时交给推理引擎与其他并发请求合并计算
+        if BATCHER is not None:
+            category, probability = BATCHER.submit(input_tensor)
+        else:
+            category, probability = _predict(MODEL, input_tensor, CLASS_NAMES)
 
+        if cache_key is not None:
+            RESULT_CACHE.set(cache_key, (category, probability))
         return category, probability
     except Exception as e:
         print(f"图像分类过程中出现错误: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+
+
+def _try_preprocess(image, out):
+    try:
+        _preprocess_image(image, out)
+        return True
+    except Exception as e:
+        print(f"图像预处理过程中出现错误: {e}")
+        return False
+
+
+def classify_images(images, k=3):
+    """
+    对多张图片进行分类：并行预处理后合并为一次批量前向计算。
+
+    :param images: 图片文件路径或文件对象的列表
+    :param k: 每张图片返回概率最高的前 k 个类别
+    :return: 与 images 等长的列表，每个元素为 [(category, probability), ...]，
+             无法处理的图片对应位置为 None
+    """
+    if MODEL is None:
+        _load_model_and_classes()
+
+    # 各张图片并行预处理，直接写入同一个预分配批次张量中各自的位置
+    batch = PREPROCESSOR.new_buffer(len(images))
+    slots = [batch[i:i + 1] for i in range(len(images))]
+    ok = list(_PREPROCESS_POOL.get().map(_try_preprocess, images, slots))
+    valid = [i for i, success in enumerate(ok) if success]
+
+    results = [None] * len(images)
+    if not valid:
+        return results
+
+    try:
+        if len(valid) < len(images):
+            batch = batch[valid]
+        for i, top_k in zip(valid, _predict_batch(MODEL, batch, CLASS_NAMES, k)):
+            results[i] = top_k
+    except Exception as e:
+        print(f"批量图像分类过程中出现错误: {e}")
+        return [None] * len(images)
+    return results
@@ -0,0 +1,90 @@
+# my_app/recognition/pool.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..process_local import ProcessLocal
+
+
+class PoolOverloaded(Exception):
+    """推理队列已满，请求被拒绝"""
+
+    def __init__(self, retry_after):
+        super().__init__("推理队列已满")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    有界的推理工作池。
+    同时执行的推理数不超过 max_workers，排队等待的请求数不超过 max_queue；
+    队列已满时立即抛出 PoolOverloaded，由接口返回 503，
+    而不是让所有请求一起变慢。
+    """
+
+    def __init__(self, max_workers=4, max_queue=16, retry_after=1):
+        self._lock = threading.Lock()
+        self._executor = ProcessLocal(
+            lambda: ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='inference')
+        )
+        self.configure(max_workers, max_queue, retry_after)
+
+    def configure(self, max_workers, max_queue, retry_after):
+        """
+        :param max_workers: 并发执行推理的线程数
+        :param max_queue: 允许排队等待的最大请求数
+        :param retry_after: 拒绝请求时建议客户端重试的间隔（秒）
+        """
+        with self._lock:
+            self.max_workers = max(1, int(max_workers))
+            self.max_queue = max(0, int(max_queue))
+            self.retry_after = int(retry_after)
+            # 配置变化后按新的并发数重建线程池；本进程中已有的线程池在执行完已提交的任务后退出，
+            # 否则每次 create_app（测试、基准测试、命令行）都会遗留一组空闲线程
+            previous = self._executor.reset()
+            if previous is not None:
+                previous.shutdown(wait=False)
+
+            self._pending = 0  # 已接纳但尚未完成的请求（排队中 + 执行中）
+            self._in_flight = 0
+            self.completed = 0
+            self.rejected = 0
+
+    def _call(self, fn, args):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._pending -= 1
+                self.completed += 1
+
+    def run(self, fn, *args):
+        """
+        在工作池中执行 fn(*args) 并阻塞等待结果。
+        :raises PoolOverloaded: 排队请求数已达上限
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolOverloaded(self.retry_after)
+            self._pending += 1
+            executor = self._executor.get()
+        return executor.submit(self._call, fn, args).result()
+
+    def stats(self):
+        """实时的队列深度与执行中请求数"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queue_depth': self._pending - self._in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+# 全局推理工作池，由 image_model.init_app 按配置设置并发数与队列深度
+inference_pool = InferencePool()
@@ -0,0 +1,102 @@
+# my_app/recognition/preprocess.py
+import math
+import threading
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class ImageTooLargeError(ValueError):
+    """图片像素数超过上限，在解码之前即被拒绝"""
+
+
+class Preprocessor:
+    """
+    图片预处理流水线，在模型加载时构建一次，之后重复使用。
+    结果与验证集的 Resize(256) -> CenterCrop(224) -> ToTensor -> Normalize 保持一致，但：
+      - JPEG 使用 draft 模式按 1/2、1/4、1/8 比例直接解码，不再先解码出完整的原图；
+      - 只对中心裁剪区域做一次缩放，跳过会被裁掉的边缘；
+      - 归一化以向量化的方式写入调用方提供的预分配缓冲区。
+    """
+
+    def __init__(self, resize=256, crop=224, mean=IMAGENET_MEAN, std=IMAGENET_STD, max_pixels=50_000_000):
+        """
+        :param resize: 短边缩放到的长度
+        :param crop: 中心裁剪的边长，即模型输入尺寸
+        :param max_pixels: 允许处理的最大像素数（宽 x 高），超过时直接拒绝
+        """
+        self.resize = resize
+        self.crop = crop
+        self.max_pixels = max_pixels
+        # (x / 255 - mean) / std == x * scale - bias
+        std_t = torch.tensor(std, dtype=torch.float32).view(3, 1, 1)
+        self.scale = 1.0 / (255.0 * std_t)
+        self.bias = torch.tensor(mean, dtype=torch.float32).view(3, 1, 1) / std_t
+        self._local = threading.local()
+
+    def new_buffer(self, batch_size=1):
+        """分配一个可容纳 batch_size 张图片的输入张量"""
+        return torch.empty(batch_size, 3, self.crop, self.crop, dtype=torch.float32)
+
+    def thread_buffer(self):
+        """
+        当前线程复用的单张图片缓冲区。
+        只能用于在同一线程内同步消费结果的场景，返回的张量会被下次调用覆盖。
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = self.new_buffer()
+        return buffer
+
+    def _crop_box(self, width, height):
+        """
+        计算与 Resize(短边=resize) + CenterCrop(crop) 等价的、在原图坐标系中的裁剪区域
+        """
+        if width <= height:
+            resized_w, resized_h = self.resize, int(self.resize * height / width)
+        else:
+            resized_w, resized_h = int(self.resize * width / height), self.resize
+
+        top = int(round((resized_h - self.crop) / 2.0))
+        left = int(round((resized_w - self.crop) / 2.0))
+        sx = width / resized_w
+        sy = height / resized_h
+        return left * sx, top * sy, (left + self.crop) * sx, (top + self.crop) * sy
+
+    def load(self, image):
+        """
+        打开并解码图片，返回裁剪缩放后的 crop x crop RGB 图像。
+        :param image: 图片的本地文件路径或文件对象
+        """
+        with Image.open(image) as img:
+            width, height = img.size
+            if width * height > self.max_pixels:
+                raise ImageTooLargeError(f"图片尺寸过大: {width}x{height}")
+
+            if img.format == 'JPEG':
+                # 请求一个短边不小于 resize 的解码尺寸，解码器会选择最大的可用缩小比例
+                ratio = self.resize / min(width, height)
+                if ratio < 1:
+                    img.draft('RGB', (math.ceil(width * ratio), math.ceil(height * ratio)))
+
+            rgb = img.convert('RGB')
+
+        box = self._crop_box(*rgb.size)
+        return rgb.resize((self.crop, self.crop), Image.BILINEAR, box=box)
+
+    def __call__(self, image, out=None):
+        """
+        :param image: 图片的本地文件路径或文件对象
+        :param out: 形状为 (1, 3, crop, crop) 的预分配张量；为空时新分配
+        :return: 归一化后的输入张量 (1, 3, crop, crop)
+        """
+        if out is None:
+            out = self.new_buffer()
+        pixels = torch.from_numpy(np.array(self.load(image))).permute(2, 0, 1)
+        torch.mul(pixels, self.scale, out=out[0])
+        out[0].sub_(self.bias)
+        return out
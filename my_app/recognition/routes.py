@@ -1,13 +1,26 @@
 # my_app/recognition/routes.py
 import os
 
-from flask import Blueprint, request, jsonify, g, send_from_directory
-from .services import recognize_text_service, recognize_image_service
-from ..decorators import login_required
+from flask import Blueprint, request, jsonify, g, send_from_directory, current_app, abort
+from werkzeug.security import safe_join
+from .services import (
+    recognize_text_service, search_text_service, recognize_image_service, recognize_images_service,
+    get_inference_stats_service
+)
+from .pool import inference_pool
+from .storage import UploadStore
+from ..decorators import login_required, admin_required
 
 recognition_bp = Blueprint('recognition', __name__, url_prefix='/api/recognize')
 
 
+def _overloaded(message):
+    """推理队列已满：快速返回 503，并提示客户端稍后重试"""
+    response = jsonify({'message': message})
+    response.headers['Retry-After'] = str(inference_pool.retry_after)
+    return response, 503
+
+
 @recognition_bp.route('/image', methods=['POST'])
 @login_required
 def recognize_image():
@@ -19,6 +32,8 @@ def recognize_image():
     category, probability, message = recognize_image_service(file, g.user)
 
     if category is None:
+        if "繁忙" in message:
+            return _overloaded(message)
         if "缺少" in message:
             return jsonify({'message': message}), 400
         if "无效" in message:
@@ -32,15 +47,61 @@ def recognize_image():
     }), 200
 
 
+@recognition_bp.route('/images', methods=['POST'])
+@login_required
+def recognize_images():
+    """多图批量识别接口，每张图片返回概率最高的 top_k 个类别"""
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'message': '缺少图片文件'}), 400
+
+    top_k = request.args.get('top_k', 3, type=int)
+    if top_k < 1:
+        return jsonify({'message': '参数 top_k 必须为正整数'}), 400
+
+    results, message = recognize_images_service(files, g.user, top_k)
+
+    if results is None:
+        if "繁忙" in message:
+            return _overloaded(message)
+        if "缺少" in message or "最多" in message:
+            return jsonify({'message': message}), 400
+        if "无效" in message:
+            return jsonify({'message': message}), 422
+        return jsonify({'message': message}), 500
+
+    return jsonify({'message': message, 'results': results}), 200
+
+
+@recognition_bp.route('/stats', methods=['GET'])
+@admin_required
+def get_inference_stats():
+    """(管理员) 获取图像识别推理引擎的批大小分布与排队等待时间"""
+    return jsonify(get_inference_stats_service()), 200
+
+
 @recognition_bp.route('/text', methods=['GET'])
 @login_required
 def recognize_text():
-    """文字识别（模糊搜索）接口"""
+    """
+    文字识别（模糊搜索）接口
+    mode=ranked 时返回按相关度排序的前 limit 个结果及得分，否则只返回最相关的一个
+    """
     query = request.args.get('q', type=str)
 
     if not query:
         return jsonify({'message': '缺少查询参数 `q`'}), 400
 
+    if request.args.get('mode') == 'ranked':
+        limit = request.args.get('limit', 10, type=int)
+        if not 1 <= limit <= 50:
+            return jsonify({'message': '参数 `limit` 的取值范围为 1-50'}), 400
+
+        results = search_text_service(query, g.user, limit)
+        if not results:
+            return jsonify({'message': '未找到匹配的垃圾信息', 'results': []}), 200
+        return jsonify({'query': query, 'results': results}), 200
+
     result = recognize_text_service(query, g.user)
 
     if not result:
@@ -49,11 +110,46 @@ def recognize_text():
     return jsonify(result.to_dict()), 200
 
 
+# 上传图片以内容哈希命名，内容永不改变，允许客户端与代理长期缓存
+UPLOAD_MAX_AGE = 365 * 24 * 3600
+
+
+def _send_upload(filename):
+    """
+    以强 ETag（文件名中的内容哈希）、长期 Cache-Control 发送图片，
+    并支持条件请求 (304) 与 Range 请求 (206)
+    """
+    etag = os.path.basename(filename).rsplit('.', 1)[0]
+    response = send_from_directory(
+        current_app.config['UPLOAD_FOLDER'], filename,
+        conditional=True, etag=etag, max_age=UPLOAD_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @recognition_bp.route('/uploads/<path:filename>')
 # @login_required
 def get_uploaded_image(filename):
     """
     为 uploads 文件夹中的图片提供访问路由
     """
-    upload_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-    return send_from_directory(upload_folder, filename)
\ No newline at end of file
+    return _send_upload(filename)
+
+
+@recognition_bp.route('/uploads/thumb/<path:filename>')
+@login_required
+def get_uploaded_thumbnail(filename):
+    """
+    获取上传图片的缩略图，供历史记录列表使用；
+    缩略图不存在时（例如较早上传的图片）按需生成。按需生成需要完整解码原图，因此只对登录用户开放
+    """
+    store = UploadStore(current_app.config['UPLOAD_FOLDER'])
+    if safe_join(store.root, filename) is None:
+        abort(404)
+
+    thumb_key = store.thumbnail_key(filename)
+    if not os.path.exists(store.path_for(thumb_key)) and store.make_thumbnail(filename) is None:
+        abort(404)
+    return _send_upload(thumb_key)
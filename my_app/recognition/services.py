@@ -1,69 +1,208 @@
 # my_app/recognition/services.py
-import os
-import uuid
-from flask import current_app, url_for
+import io
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, func
 from werkzeug.utils import secure_filename
-from .image_model import classify_image
-from ..models import db, GarbageItem, QueryHistory
+from .cache import content_digest
+from .image_model import classify_image, classify_images, get_inference_stats, lookup_cached_result
+from .pool import inference_pool, PoolOverloaded
+from .storage import upload_writer, UploadStore
+from .text_index import garbage_index
+from ..history.buffer import history_buffer
+from ..history.rollups import increment_rollups
+from ..models import db, GarbageItem, QueryHistory, User
+from ..ngram_index import NgramIndex, substring_score
 
 
-def recognize_text_service(query, user):
-    """文字识别及记录历史的业务逻辑"""
+def _upload_key(file, digest):
+    """按图片内容的摘要计算存储键（分片的相对路径），保留原始扩展名"""
+    filename = secure_filename(file.filename)
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'jpg'
+    return UploadStore.key_for(digest, ext)
+
+
+def _persist_upload(upload_key, data):
+    """
+    按配置保存图片：async 交给后台线程落盘（队列已满时退回同步写入），sync 同步写入，off 不保存
+    """
+    persist_mode = current_app.config.get('UPLOAD_PERSIST_MODE', 'async')
+    store = UploadStore(current_app.config['UPLOAD_FOLDER'])
+    if persist_mode == 'async':
+        if not upload_writer.submit(store.save, upload_key, data):
+            store.save(upload_key, data)
+    elif persist_mode == 'sync':
+        store.save(upload_key, data)
+
+
+def _record_history(user, query_type, entries):
+    """
+    为一次或多次识别增加积分、记录历史并累加趋势统计，所有写入在同一个事务中提交。
+    开启写后缓冲时只放入缓冲，由后台线程批量写入。
+    :param entries: [(query_content, result_category), ...]
+    """
+    now = datetime.now()
+    if history_buffer.submit(user.id, query_type, entries, now):
+        return
+
+    # 以 points = points + 增量 的形式更新：请求开始时读到的积分可能已过期，
+    # 不能覆盖写后缓冲或兑换同时写入的修改
+    user.points = User.points + len(entries)
+    db.session.add_all([
+        QueryHistory(
+            user_id=user.id,
+            query_type=query_type,
+            query_content=query_content,
+            result_category=result_category,
+            created_at=now
+        )
+        for query_content, result_category in entries
+    ])
+    increment_rollups([(user.id, query_type, result_category, now) for _, result_category in entries])
+    db.session.commit()
+
+
+def _search_garbage_items(query, limit):
+    """
+    按相关度返回名称包含 query 的前 limit 个物品
+    :return: [{'id', 'name', 'category', 'score'}, ...]
+    """
+    if current_app.config.get('GARBAGE_INDEX_ENABLED', True):
+        # 在内存子串索引中查找，不访问 garbage_item 表
+        return garbage_index.search(query, limit)
+
     search_term = f"%{query}%"
-    result = GarbageItem.query.filter(GarbageItem.name.ilike(search_term)).first()
+    rank = case(
+        (func.lower(GarbageItem.name) == query.lower(), 0),
+        (GarbageItem.name.ilike(f"{query}%"), 1),
+        else_=2
+    )
+    items = GarbageItem.query.filter(GarbageItem.name.ilike(search_term)) \
+        .order_by(rank, func.length(GarbageItem.name), GarbageItem.id).limit(limit).all()
+
+    q = NgramIndex.normalize(query)
+    results = []
+    for item in items:
+        name = NgramIndex.normalize(item.name)
+        score = substring_score(q, name) if q in name else 1.0
+        results.append({**item.to_dict(), 'score': round(score, 4)})
+    return results
+
+
+def recognize_text_service(query, user):
+    """文字识别及记录历史的业务逻辑，返回相关度最高的一个物品"""
+    best = _search_garbage_items(query, 1)
+    result = GarbageItem(id=best[0]['id'], name=best[0]['name'], category=best[0]['category']) if best else None
 
     result_category = result.category if result else '未找到'
 
     # 增加积分并记录历史
-    user.points += 1
-    new_history = QueryHistory(
-        user_id=user.id,
-        query_type='text',
-        query_content=query,
-        result_category=result_category
-    )
-    db.session.add(new_history)
-    db.session.commit()
+    _record_history(user, 'text', [(query, result_category)])
 
     return result
 
 
+def search_text_service(query, user, limit=10):
+    """
+    文字识别的排序搜索模式：返回相关度最高的前 limit 个物品及其得分，
+    历史记录中保存排名第一的物品类别
+    """
+    results = _search_garbage_items(query, limit)
+
+    result_category = results[0]['category'] if results else '未找到'
+    _record_history(user, 'text', [(query, result_category)])
+
+    return results
+
+
 def recognize_image_service(file, user):
     """图片识别、保存、记录历史的业务逻辑"""
     if not file or file.filename == '':
         return None, None, "缺少或未选择文件"
 
     try:
-        # 1. 保存图片
-        filename = secure_filename(file.filename)
-        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'jpg'
-        unique_filename = f"{uuid.uuid4()}.{ext}"
+        # 1. 直接在内存中读取上传内容，识别过程不经过磁盘
+        data = file.read()
+        # 内容摘要只计算一次，同时用作存储键与 sha256 模式下的结果缓存键
+        digest = content_digest(data)
+        upload_key = _upload_key(file, digest)
 
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        upload_path = os.path.join(upload_folder, unique_filename)
-        file.save(upload_path)
-
-        # 2. 调用模型分类
-        category, probability = classify_image(upload_path)
+        # 2. 命中结果缓存时直接返回，否则经由有界工作池调用模型分类
+        cache_key, cached = lookup_cached_result(io.BytesIO(data), digest)
+        if cached is not None:
+            category, probability = cached
+        else:
+            category, probability = inference_pool.run(classify_image, io.BytesIO(data), cache_key)
 
         if category is None:
             return None, None, "图片文件无效或无法处理"
 
-        # 3. 增加积分并记录历史
-        user.points += 1
-        image_url = url_for('static', filename=f'uploads/{unique_filename}', _external=True)
-        new_history = QueryHistory(
-            user_id=user.id,
-            query_type='image',
-            query_content=unique_filename,
-            result_category=category
-        )
-        db.session.add(new_history)
-        db.session.commit()
+        # 3. 保存图片
+        _persist_upload(upload_key, data)
+
+        # 4. 增加积分并记录历史
+        _record_history(user, 'image', [(upload_key, category)])
 
         return category, probability, "识别成功"
+    except PoolOverloaded:
+        return None, None, "服务繁忙，请稍后重试"
     except Exception as e:
         # 可以添加日志记录
         print(f"Error in recognize_image_service: {e}")
-        return None, None, "服务器端发生未知错误"
\ No newline at end of file
+        return None, None, "服务器端发生未知错误"
+
+
+def recognize_images_service(files, user, top_k=3):
+    """
+    多图批量识别的业务逻辑：并行预处理、一次批量推理，
+    整批的历史记录与积分在同一个事务中写入。
+    :return: (results, message)，results 与 files 一一对应
+    """
+    files = [f for f in files if f and f.filename != '']
+    if not files:
+        return None, "缺少或未选择文件"
+
+    max_files = current_app.config.get('RECOGNITION_MAX_FILES_PER_REQUEST', 32)
+    if len(files) > max_files:
+        return None, f"单次最多识别 {max_files} 张图片"
+
+    try:
+        uploads = []
+        for f in files:
+            data = f.read()
+            uploads.append((f.filename, _upload_key(f, content_digest(data)), data))
+        predictions = inference_pool.run(classify_images, [io.BytesIO(data) for _, _, data in uploads], top_k)
+
+        results = []
+        entries = []
+        for (filename, upload_key, data), top in zip(uploads, predictions):
+            if top is None:
+                results.append({'filename': filename, 'message': "图片文件无效或无法处理"})
+                continue
+
+            category, probability = top[0]
+            _persist_upload(upload_key, data)
+            entries.append((upload_key, category))
+            results.append({
+                'filename': filename,
+                'category': category,
+                'probability': probability,
+                'top_k': [{'category': c, 'probability': p} for c, p in top]
+            })
+
+        if not entries:
+            return None, "图片文件无效或无法处理"
+
+        _record_history(user, 'image', entries)
+
+        return results, "识别成功"
+    except PoolOverloaded:
+        return None, "服务繁忙，请稍后重试"
+    except Exception as e:
+        print(f"Error in recognize_images_service: {e}")
+        return None, "服务器端发生未知错误"
+
+
+def get_inference_stats_service():
+    """获取图像识别推理引擎运行统计的业务逻辑"""
+    return {**get_inference_stats(), 'history_buffer': history_buffer.stats(), 'upload_writer': upload_writer.stats()}
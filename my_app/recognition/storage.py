@@ -0,0 +1,153 @@
+# my_app/recognition/storage.py
+import atexit
+import io
+import os
+import queue
+import threading
+
+from PIL import Image
+
+from ..process_local import ProcessLocal
+
+
+def write_file(path, data):
+    """
+    将字节内容原子地写入磁盘：先写临时文件再重命名，
+    避免读取方看到写了一半的图片。
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class BackgroundWriter:
+    """
+    后台文件写入器。
+    识别请求只需把上传内容放入队列即可返回，落盘由后台线程完成，
+    从而把磁盘（或网络存储）I/O 移出请求的关键路径。
+    队列有上限：磁盘持续慢于请求速度时不再堆积待写入的图片（每项都持有整张图片的内容），
+    而是由调用方同步写入，请求随之变慢，内存占用保持有界。
+    """
+
+    def __init__(self, max_pending=256):
+        self._queue = ProcessLocal(self._start)
+        self.max_pending = max_pending
+        self.overflowed = 0
+
+    def init_app(self, app):
+        # 队列在本进程第一次提交任务时按此上限创建
+        self.max_pending = app.config.get('UPLOAD_WRITER_MAX_PENDING', 256)
+
+    def _start(self):
+        tasks = queue.Queue(maxsize=max(1, int(self.max_pending)))
+        threading.Thread(target=self._run, args=(tasks,), name='upload-writer', daemon=True).start()
+        return tasks
+
+    def submit(self, fn, *args):
+        """
+        将一次写入任务 fn(*args) 加入队列，立即返回
+        :return: 是否已放入队列；队列已满时返回 False，由调用方同步写入
+        """
+        try:
+            self._queue.get().put_nowait((fn, args))
+        except queue.Full:
+            self.overflowed += 1
+            return False
+        return True
+
+    def pending(self):
+        """当前尚未写入磁盘的任务数"""
+        tasks = self._queue.peek()
+        return tasks.qsize() if tasks is not None else 0
+
+    def flush(self):
+        """阻塞直到队列中的所有写入任务完成"""
+        tasks = self._queue.peek()
+        if tasks is not None:
+            tasks.join()
+
+    def stats(self):
+        return {
+            'pending': self.pending(),
+            'max_pending': self.max_pending,
+            'overflowed': self.overflowed,
+        }
+
+    def _run(self, tasks):
+        while True:
+            fn, args = tasks.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"后台保存上传文件失败: {args[0] if args else ''} ({e})")
+            finally:
+                tasks.task_done()
+
+
+class UploadStore:
+    """
+    按内容寻址的上传图片存储。
+    文件以内容的 SHA-256 命名，相同图片只保存一份；
+    并按哈希前缀分为两级子目录（ab/cd/abcd....jpg），避免单个目录下堆积数百万个文件。
+    每张图片另外生成一张缩略图，保存在 thumbs/ 下相同的相对路径中，供历史记录页面使用。
+    """
+
+    THUMB_DIR = 'thumbs'
+
+    def __init__(self, root, thumb_size=256):
+        self.root = root
+        self.thumb_size = thumb_size
+
+    @staticmethod
+    def key_for(digest, ext):
+        """
+        根据图片内容的 SHA-256 摘要计算存储键（相对路径）
+        :param digest: 十六进制摘要，与结果缓存的 sha256 缓存键相同，由调用方计算一次后共用
+        """
+        ext = 'jpg' if ext == 'jpeg' else ext
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+    def path_for(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def thumbnail_key(self, key):
+        return f"{self.THUMB_DIR}/{key.rsplit('.', 1)[0]}.jpg"
+
+    def save(self, key, data):
+        """保存图片及其缩略图；内容相同的图片已存在时直接跳过"""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            write_file(path, data)
+        if not os.path.exists(self.path_for(self.thumbnail_key(key))):
+            self.make_thumbnail(key, data)
+
+    def make_thumbnail(self, key, data=None):
+        """
+        生成缩略图，返回其存储键；原图不存在或无法解码时返回 None。
+        """
+        if data is None:
+            try:
+                with open(self.path_for(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+
+        thumb_key = self.thumbnail_key(key)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.draft('RGB', (self.thumb_size, self.thumb_size))
+                img = img.convert('RGB')
+                img.thumbnail((self.thumb_size, self.thumb_size))
+                buf = io.BytesIO()
+                img.save(buf, 'JPEG', quality=80)
+        except Exception:
+            return None
+        write_file(self.path_for(thumb_key), buf.getvalue())
+        return thumb_key
+
+
+# 全局写入器实例；进程退出前等待已排队的上传文件全部落盘
+upload_writer = BackgroundWriter()
+atexit.register(upload_writer.flush)
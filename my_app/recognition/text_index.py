@@ -0,0 +1,151 @@
+# my_app/recognition/text_index.py
+from sqlalchemy import event
+
+from ..models import db, GarbageItem
+from ..data_version import bump_data_version, get_data_version
+from ..fuzzy_index import FuzzyIndex
+from ..index_sync import PendingChanges, SnapshotIndex
+from ..ngram_index import NgramIndex
+
+
+class _IndexSnapshot:
+    """一次完整构建得到的子串索引、容错索引与物品字典，整体替换，查询时只读取一次"""
+    __slots__ = ('ngram', 'fuzzy', 'items')
+
+    def __init__(self, ngram, fuzzy, items):
+        self.ngram = ngram
+        self.fuzzy = fuzzy
+        self.items = items
+
+
+class GarbageItemIndex(SnapshotIndex):
+    """
+    垃圾物品名称的进程内子串索引，文字识别直接在内存中完成，不再对 garbage_item 做全表扫描。
+    子串匹配落空时，再经由容错索引按编辑距离与拼音查找（错别字、拼音输入）。
+
+    加载、指纹比对与整体替换见 SnapshotIndex。数据库指纹是 data_version 表中 garbage_item 的版本号：
+    每个写入 garbage_item 的事务同时把它加一（ORM 写入由下方的事件完成，批量导入由 import-items 完成）。
+    """
+
+    VERSION_NAME = 'garbage_item'
+
+    def __init__(self, check_interval=30.0):
+        self._fuzzy_options = {}
+        super().__init__(check_interval)
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('GARBAGE_INDEX_CHECK_INTERVAL', 30)
+        self._fuzzy_options = {
+            'max_distance': app.config.get('GARBAGE_FUZZY_MAX_DISTANCE', 1),
+            'pinyin': app.config.get('GARBAGE_FUZZY_PINYIN', True),
+        }
+        self._snapshot = self._empty_snapshot()
+        self._loaded = False
+
+    def _empty_snapshot(self):
+        return _IndexSnapshot(NgramIndex(), FuzzyIndex(**self._fuzzy_options), {})
+
+    def _db_fingerprint(self):
+        return get_data_version(self.VERSION_NAME)
+
+    def _build_snapshot(self):
+        rows = db.session.query(GarbageItem.id, GarbageItem.name, GarbageItem.category) \
+            .execution_options(yield_per=10000)
+        items = {}
+        for item_id, name, category in rows:
+            items[item_id] = (name, category)
+
+        ngram = NgramIndex()
+        ngram.build((item_id, name) for item_id, (name, _) in items.items())
+        fuzzy = FuzzyIndex(**self._fuzzy_options)
+        fuzzy.build((item_id, name) for item_id, (name, _) in items.items())
+        return _IndexSnapshot(ngram, fuzzy, items)
+
+    def _needs_rebuild(self):
+        return self._snapshot.ngram.stale_ratio > 0.2
+
+    def advance(self, base_version, version):
+        """
+        本进程的事务提交后推进版本号：只有索引恰好处于该事务之前的版本时才能直接推进，
+        否则期间还有其他进程的写入，保持原版本号，留待下次检查时重建
+        """
+        if self._fingerprint == base_version:
+            self._fingerprint = version
+
+    def upsert(self, item_id, name, category):
+        """应用本进程已提交的新增或修改；先写物品字典，索引中出现的ID总能查到物品"""
+        snapshot = self._snapshot
+        snapshot.items[item_id] = (name, category)
+        snapshot.ngram.add(item_id, name)
+        snapshot.fuzzy.add(item_id, name)
+
+    def remove(self, item_id):
+        """应用本进程已提交的删除；先从索引中移除，最后才删除物品字典中的记录"""
+        snapshot = self._snapshot
+        snapshot.ngram.remove(item_id)
+        snapshot.fuzzy.remove(item_id)
+        snapshot.items.pop(item_id, None)
+
+    def search(self, query, limit=10):
+        """
+        按相关度（完全匹配 > 前缀匹配 > 匹配位置靠前 > 名称较短）返回名称包含 query 的前 limit 个物品；
+        没有任何物品包含 query 时，改为返回容错匹配的结果（得分小于 1）
+        :return: [{'id', 'name', 'category', 'score'}, ...]
+        """
+        self.ensure_fresh()
+        snapshot = self._snapshot
+        matches = snapshot.ngram.search_ranked(query, limit) or snapshot.fuzzy.search(query, limit)
+        results = []
+        for item_id, score in matches:
+            item = snapshot.items.get(item_id)
+            if item is None:
+                # 与并发的删除交错时，索引给出的ID可能刚刚被移除
+                continue
+            name, category = item
+            results.append({'id': item_id, 'name': name, 'category': category, 'score': round(score, 4)})
+        return results
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'loaded': self._loaded,
+            'items': len(snapshot.items),
+            'stale_ratio': snapshot.ngram.stale_ratio,
+            'fuzzy_max_distance': snapshot.fuzzy.max_distance,
+            'fuzzy_pinyin': snapshot.fuzzy.pinyin,
+        }
+
+
+garbage_index = GarbageItemIndex()
+
+
+def _bump_version(connection):
+    # 每个事务只需加一次版本号：版本号所在行锁定到事务结束，其他进程的写入事务会排在其后
+    version = bump_data_version(GarbageItemIndex.VERSION_NAME, connection)
+    return version - 1, version
+
+
+def _apply_changes(changes, versions):
+    if not garbage_index._loaded:
+        return
+    for op, item_id, name, category in changes:
+        if op == 'upsert':
+            garbage_index.upsert(item_id, name, category)
+        else:
+            garbage_index.remove(item_id)
+    garbage_index.advance(*versions)
+
+
+# --- 本进程内通过 ORM 的修改：先记录在会话中，事务提交后再应用到索引 ---
+_changes = PendingChanges('garbage_index_changes', _apply_changes, begin=_bump_version)
+
+
+@event.listens_for(GarbageItem, 'after_insert')
+@event.listens_for(GarbageItem, 'after_update')
+def _after_upsert(mapper, connection, target):
+    _changes.record(connection, target, ('upsert', target.id, target.name, target.category))
+
+
+@event.listens_for(GarbageItem, 'after_delete')
+def _after_delete(mapper, connection, target):
+    _changes.record(connection, target, ('delete', target.id, target.name, target.category))
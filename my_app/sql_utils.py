@@ -0,0 +1,99 @@
+# my_app/sql_utils.py
+from sqlalchemy import func
+
+from . import db
+
+
+def upsert_statement(table, index_elements, update_columns=(), increment_columns=()):
+    """
+    构造按唯一键"存在则更新、不存在则插入"的批量语句，配合 session.execute(stmt, rows) 以 executemany 方式执行。
+    支持 MySQL (ON DUPLICATE KEY UPDATE) 以及 SQLite / PostgreSQL (ON CONFLICT DO UPDATE)。
+    :param table: Table 对象或模型类
+    :param index_elements: 唯一键列名列表（MySQL 由表上的唯一索引自动判断）
+    :param update_columns: 冲突时用新值覆盖的列名列表
+    :param increment_columns: 冲突时在原值上累加新值的列名列表（计数器）
+    """
+    table = getattr(table, '__table__', table)
+    dialect = db.session.get_bind().dialect.name
+
+    def assignments(new_values):
+        values = {col: new_values[col] for col in update_columns}
+        values.update({col: table.c[col] + new_values[col] for col in increment_columns})
+        return values
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(assignments(stmt.inserted))
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=assignments(stmt.excluded))
+
+    raise NotImplementedError(f"不支持的数据库类型: {dialect}")
+
+
+def insert_ignore_statement(table, index_elements):
+    """
+    构造"唯一键已存在则跳过"的插入语句，可配合 executemany 或 from_select 使用。
+    支持 MySQL (INSERT IGNORE) 以及 SQLite / PostgreSQL (ON CONFLICT DO NOTHING)。
+    """
+    table = getattr(table, '__table__', table)
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        return insert(table).prefix_with('IGNORE')
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+    raise NotImplementedError(f"不支持的数据库类型: {dialect}")
+
+
+def truncate_to_hour(column):
+    """将时间列截断到整点的 SQL 表达式，用于按小时分组"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        return func.date_format(column, '%Y-%m-%d %H:00:00')
+    if dialect == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+    if dialect == 'postgresql':
+        return func.date_trunc('hour', column)
+    raise NotImplementedError(f"不支持的数据库类型: {dialect}")
+
+
+def starts_with(column, prefix):
+    """
+    "列值以 prefix 开头"的过滤条件，能够沿该列上的索引做范围扫描。
+    MySQL / PostgreSQL 使用 LIKE 'prefix%'；SQLite 的 LIKE 不区分大小写，无法使用默认 (BINARY) 排序规则的索引，
+    改用区分大小写的 GLOB 'prefix*'。prefix 中的通配符均按普通字符匹配。
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        escaped = ''.join(f'[{c}]' if c in '*?[' else c for c in prefix)
+        return column.op('GLOB')(escaped + '*')
+    if dialect in ('mysql', 'postgresql'):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return column.like(f"{escaped}%", escape='\\')
+    raise NotImplementedError(f"不支持的数据库类型: {dialect}")
+
+
+def chunked(iterable, size):
+    """将任意可迭代对象按 size 分批产出列表，不会一次性读入全部数据"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,29 @@
+# wsgi.py
+# 生产环境入口，配合 gunicorn.conf.py 使用: gunicorn -c gunicorn.conf.py
+import gc
+
+import torch
+
+from my_app import create_app, db
+from my_app.recognition import image_model
+from my_app.recognition.text_index import garbage_index
+from my_app.articles.search_index import article_index
+
+app = create_app()
+
+# 主进程只负责加载权重，不执行推理：限制为单线程，避免在 fork 前初始化 OpenMP 线程池
+torch.set_num_threads(1)
+image_model.warm_up()
+
+# 预先构建垃圾物品名称索引与文章全文索引，各 worker 共享
+with app.app_context():
+    if app.config.get('GARBAGE_INDEX_ENABLED', True):
+        garbage_index.load()
+    article_index.load()
+    # 预加载时从连接池取出的数据库连接仍留在池中；fork 后各 worker 共用同一个套接字会导致协议错乱，
+    # 因此在 fork 之前关闭，worker 首次访问数据库时各自建立新连接
+    db.engine.dispose()
+
+# 冻结主进程中已存在的对象，使 fork 出的 worker 在垃圾回收时不再改写这些对象，
+# 从而尽可能保持模型权重等内存页以写时复制的方式共享
+gc.freeze()